@@ -6,6 +6,14 @@ from flask_cors import CORS
 from models import db
 from config import Config
 from init_roles_and_permissions import init_roles_and_permissions  # Ensure this import is correct
+from services.fee_ledger import rebuild_fee_ledger_command
+from services.grading import recompute_grades_command
+from services.audit_archive import archive_audit_logs_command
+from services.attendance_rollups import rebuild_attendance_rollups_command
+from services.attendance_archive import archive_attendance_command
+from services.report_card_pdfs import render_report_cards_command, ReportCardRendererBusy
+from services.passwords import PasswordHasherBusy
+from services.import_jobs import fail_interrupted_imports_command
 
 def create_app():
     app = Flask(__name__)
@@ -21,7 +29,28 @@ def create_app():
     JWTManager(app)
 
     # Enable CORS
-    CORS(app)
+    CORS(app, expose_headers=["X-Next-Cursor", "X-Total-Count"])
+
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        response = jsonify({"message": "Server busy, please try again shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    @app.errorhandler(ReportCardRendererBusy)
+    def report_card_renderer_busy(e):
+        response = jsonify({"message": "Report cards are being rendered for other requests, please try again shortly"})
+        response.headers["Retry-After"] = "10"
+        return response, 503
+
+    # CLI commands
+    app.cli.add_command(rebuild_fee_ledger_command)
+    app.cli.add_command(recompute_grades_command)
+    app.cli.add_command(archive_audit_logs_command)
+    app.cli.add_command(rebuild_attendance_rollups_command)
+    app.cli.add_command(archive_attendance_command)
+    app.cli.add_command(render_report_cards_command)
+    app.cli.add_command(fail_interrupted_imports_command)
 
     with app.app_context():
         db.create_all()  # Ensure tables are created
@@ -31,7 +60,8 @@ def create_app():
 
     # Initialize routes
     from routes import users, teachers, students, roles, subjects, fees, \
-    classes, parents, grades, expenses
+    classes, parents, grades, expenses, import_jobs, grading_scales, audit_logs, search, attendances, \
+    results, report_cards
 
     # Register blueprints for different routes
     app.register_blueprint(users.auth_bp, url_prefix='/api')
@@ -44,6 +74,13 @@ def create_app():
     app.register_blueprint(parents.parent_bp, url_prefix='/api')
     app.register_blueprint(grades.grades_bp, url_prefix='/api')
     app.register_blueprint(expenses.expense_bp,url_prefix='/api')
+    app.register_blueprint(import_jobs.import_jobs_bp, url_prefix='/api')
+    app.register_blueprint(grading_scales.grading_scale_bp, url_prefix='/api')
+    app.register_blueprint(audit_logs.audit_bp, url_prefix='/api')
+    app.register_blueprint(search.search_bp, url_prefix='/api')
+    app.register_blueprint(attendances.attendance_api_bp, url_prefix='/api')
+    app.register_blueprint(results.result_bp, url_prefix='/api')
+    app.register_blueprint(report_cards.report_cards_bp, url_prefix='/api')
 
     # List all routes for debugging purposes
     @app.route('/')
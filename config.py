@@ -11,10 +11,98 @@ class Config:
     JWT_HEADER_NAME = "Authorization"
     JWT_HEADER_TYPE = "Bearer"
 
+    # Let JWT errors raised inside Flask-RESTful resources reach the
+    # JWTManager error handlers (401/422) instead of becoming a 500
+    PROPAGATE_EXCEPTIONS = True
+
+    # Password hashing, a werkzeug method string ("scrypt:n:r:p" or
+    # "pbkdf2:sha256:iterations"). Hashes made with other parameters are
+    # replaced on the user's next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH') or 16)
+
+    # Hashes run in a process pool of this many workers (0 hashes on the
+    # request thread). At most PASSWORD_HASH_QUEUE_SIZE more may wait for a
+    # worker, further logins get a 503 right away instead of tying up the
+    # web worker, as do hashes taking longer than PASSWORD_HASH_TIMEOUT seconds.
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE') or 8)
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT') or 10)
+
     # Uploads folder configuration
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+    # Rows written per insert/commit by the bulk fee and grade imports
+    FEE_IMPORT_CHUNK_SIZE = int(os.environ.get('FEE_IMPORT_CHUNK_SIZE') or 1000)
+    GRADE_IMPORT_CHUNK_SIZE = int(os.environ.get('GRADE_IMPORT_CHUNK_SIZE') or 1000)
+
+    # Accounts per multi-row insert of POST /users/bulk
+    USER_PROVISIONING_CHUNK_SIZE = int(os.environ.get('USER_PROVISIONING_CHUNK_SIZE') or 500)
+
+    # Audit events are queued and written in batches of up to AUDIT_BATCH_SIZE,
+    # at most AUDIT_FLUSH_INTERVAL seconds after they happen. With AUDIT_ASYNC
+    # off every event is written in the transaction of the change it records.
+    AUDIT_ASYNC = (os.environ.get('AUDIT_ASYNC') or 'true').lower() == 'true'
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE') or 200)
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL') or 1)
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE') or 10000)
+
+    # Default page size of GET /audit_logs
+    AUDIT_PAGE_SIZE = int(os.environ.get('AUDIT_PAGE_SIZE') or 100)
+
+    # flask archive-audit-logs keeps this many days in audit_logs, older entries
+    # go to monthly archive tables or to gzipped files in AUDIT_ARCHIVE_FOLDER
+    AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS') or 365)
+    AUDIT_ARCHIVE_FOLDER = os.environ.get('AUDIT_ARCHIVE_FOLDER') or os.path.join(os.getcwd(), 'archive', 'audit_logs')
+
+    # Month the academic year starts in, e.g. 9 makes Sept 2024 - Aug 2025 "2024-2025"
+    ACADEMIC_YEAR_START_MONTH = int(os.environ.get('ACADEMIC_YEAR_START_MONTH') or 9)
+
+    # Seconds between checks of the RBAC cache version when authorizing requests.
+    # Issuing a token always checks it, so tokens never miss a user or role
+    # change committed by another worker
+    RBAC_CACHE_CHECK_INTERVAL = float(os.environ.get('RBAC_CACHE_CHECK_INTERVAL') or 5)
+
+    # Default page size of the list endpoints (students, teachers, fees, ...)
+    LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE') or 100)
+
+    # Seconds between checks of the people search index version, i.e. how long
+    # a change made by another worker may take to show up in GET /search
+    SEARCH_INDEX_CHECK_INTERVAL = float(os.environ.get('SEARCH_INDEX_CHECK_INTERVAL') or 5)
+
+    # Percentage of recorded days absent from which a student counts as
+    # chronically absent in GET /attendance/chronic_absence
+    CHRONIC_ABSENCE_THRESHOLD = float(os.environ.get('CHRONIC_ABSENCE_THRESHOLD') or 10)
+
+    # Default page size of GET /grades
+    GRADES_PAGE_SIZE = int(os.environ.get('GRADES_PAGE_SIZE') or 100)
+
+    # Weight of each exam type in a report card's subject average, e.g.
+    # "Final=50,Midterm=30,Quiz=10,Assignment=10". Weights are relative: a
+    # student without a Quiz is averaged over the types they sat.
+    EXAM_TYPE_WEIGHTS = {
+        exam_type.strip(): float(weight)
+        for exam_type, weight in (
+            pair.split('=') for pair in
+            (os.environ.get('EXAM_TYPE_WEIGHTS') or 'Final=50,Midterm=30,Quiz=10,Assignment=10').split(',')
+        )
+    }
+
+    # Background imports (?async=true)
+    IMPORT_JOB_WORKERS = int(os.environ.get('IMPORT_JOB_WORKERS') or 2)
+    IMPORT_SPOOL_FOLDER = os.path.join(UPLOAD_FOLDER, 'imports')
+
+    # PDF report cards: worker processes rendering them (0 renders in the
+    # request or command process), cards sent to a worker at a time, and
+    # where `flask render-report-cards` spools its output. The workers are
+    # shared by the downloads of a process, of which at most
+    # REPORT_CARD_CONCURRENT_BATCHES run at once, further ones get a 503.
+    REPORT_CARD_WORKERS = int(os.environ.get('REPORT_CARD_WORKERS') or 4)
+    REPORT_CARD_CHUNK_SIZE = int(os.environ.get('REPORT_CARD_CHUNK_SIZE') or 25)
+    REPORT_CARD_CONCURRENT_BATCHES = int(os.environ.get('REPORT_CARD_CONCURRENT_BATCHES') or 2)
+    REPORT_CARD_SPOOL_FOLDER = os.path.join(UPLOAD_FOLDER, 'report_cards')
+
     @staticmethod
     def init_app(app):
         # Ensure the UPLOAD_FOLDER exists
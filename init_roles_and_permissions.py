@@ -14,12 +14,15 @@ permissions = [
     {"name": "add_students", "description": "Add new students"},
     {"name": "update_students", "description": "Update student details"},
     {"name": "delete_students", "description": "Delete student records"},
+    {"name": "add_users", "description": "Create user accounts"},
+    {"name": "view_audit_logs", "description": "View the audit log"},
+    {"name": "search_people", "description": "Search people and their contact details"},
 ]
 
 # Predefined role-permission mappings
 role_permissions = {
-    "Admin": ["view_students", "add_students", "update_students", "delete_students"],
-    "Teacher": ["view_students", "update_students"],
+    "Admin": ["view_students", "add_students", "update_students", "delete_students", "add_users", "view_audit_logs", "search_people"],
+    "Teacher": ["view_students", "update_students", "search_people"],
     "Student": ["view_students", "view_results"],
     "Parent": ["view_students", "view_reports"],
 }
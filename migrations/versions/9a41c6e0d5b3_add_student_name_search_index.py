@@ -0,0 +1,63 @@
+"""Add student name search index
+
+Revision ID: 9a41c6e0d5b3
+Revises: 0b6e93d4c2f1
+Create Date: 2026-10-18 17:32:51.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a41c6e0d5b3'
+down_revision = '0b6e93d4c2f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # External content FTS5 table with the trigram tokenizer (SQLite 3.34+),
+        # so substring searches don't have to scan students
+        op.execute(
+            "CREATE VIRTUAL TABLE student_name_fts USING fts5("
+            "first_name, last_name, content='students', content_rowid='student_id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER students_name_fts_insert AFTER INSERT ON students BEGIN "
+            "INSERT INTO student_name_fts(rowid, first_name, last_name) "
+            "VALUES (new.student_id, new.first_name, new.last_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER students_name_fts_delete AFTER DELETE ON students BEGIN "
+            "INSERT INTO student_name_fts(student_name_fts, rowid, first_name, last_name) "
+            "VALUES ('delete', old.student_id, old.first_name, old.last_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER students_name_fts_update AFTER UPDATE OF first_name, last_name ON students BEGIN "
+            "INSERT INTO student_name_fts(student_name_fts, rowid, first_name, last_name) "
+            "VALUES ('delete', old.student_id, old.first_name, old.last_name); "
+            "INSERT INTO student_name_fts(rowid, first_name, last_name) "
+            "VALUES (new.student_id, new.first_name, new.last_name); END"
+        )
+        op.execute("INSERT INTO student_name_fts(student_name_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index('ix_students_first_name_trgm', 'students', ['first_name'],
+                        postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'})
+        op.create_index('ix_students_last_name_trgm', 'students', ['last_name'],
+                        postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS students_name_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS students_name_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS students_name_fts_insert")
+        op.execute("DROP TABLE IF EXISTS student_name_fts")
+    elif dialect == 'postgresql':
+        op.drop_index('ix_students_last_name_trgm', table_name='students')
+        op.drop_index('ix_students_first_name_trgm', table_name='students')
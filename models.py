@@ -3,7 +3,7 @@ import string
 from sqlalchemy.orm import validates
 from flask_sqlalchemy import SQLAlchemy
 from enum import Enum
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.passwords import hash_password, verify_password, needs_rehash
 
 db = SQLAlchemy()
 
@@ -21,11 +21,19 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Check ``password``, upgrading a hash made with outdated parameters.
+
+        The new hash is only set on the instance, committing it is up to the caller.
+        """
+        if not verify_password(self.password_hash, password):
+            return False
+        if needs_rehash(self.password_hash):
+            self.password_hash = hash_password(password)
+        return True
 
 
 # Additional tables for user management and permissions
@@ -63,8 +71,14 @@ class UserRole(db.Model):
 
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('ix_audit_logs_user_created', 'user_id', 'created_at'),
+        db.Index('ix_audit_logs_action_created', 'action', 'created_at'),
+        db.Index('ix_audit_logs_created_at', 'created_at'),
+    )
     log_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('Users.user_id'), nullable=False)
+    # Null for actions made without a logged in user
+    user_id = db.Column(db.Integer, db.ForeignKey('Users.user_id'), nullable=True)
     action = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
@@ -72,7 +86,7 @@ class AuditLog(db.Model):
     user = db.relationship('User', backref='audit_logs', lazy=True)
 
     def __repr__(self):
-        return f"<AuditLog {self.user.username} - {self.action}>"
+        return f"<AuditLog {self.user.username if self.user else None} - {self.action}>"
     
 
 class Student(db.Model):
@@ -158,6 +172,9 @@ class Result(db.Model):
 
 class Attendance(db.Model):
     __tablename__ = 'Attendance'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'class_id', 'attendance_date', name='uq_attendance_student_class_date'),
+    )
     attendance_id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.student_id'), nullable=False)
     class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
@@ -168,6 +185,49 @@ class Attendance(db.Model):
     class_ = db.relationship('Classes', backref='attendance', lazy=True)
 
 
+class AttendanceStudentMonth(db.Model):
+    """Present/Absent/Late counts per student and calendar month.
+
+    Maintained by services.attendance_rollups whenever attendance is written.
+    """
+    __tablename__ = 'attendance_student_months'
+    student_id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AttendanceClassDay(db.Model):
+    """Present/Absent/Late counts per class and day.
+
+    Maintained by services.attendance_rollups whenever attendance is written.
+    """
+    __tablename__ = 'attendance_class_days'
+    class_id = db.Column(db.Integer, primary_key=True)
+    attendance_date = db.Column(db.Date, primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AttendanceArchive(db.Model):
+    """A student's attendance in one class over an academic year, two bits a day.
+
+    Day ``i`` of ``statuses`` is ``first_day + i``. Written by
+    services.attendance_archive, which moves whole months of old Attendance
+    rows here; days from ``archived_until`` on are still in Attendance.
+    """
+    __tablename__ = 'attendance_archives'
+    student_id = db.Column(db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, primary_key=True)
+    academic_year = db.Column(db.String(9), primary_key=True)
+    first_day = db.Column(db.Date, nullable=False)
+    statuses = db.Column(db.LargeBinary, nullable=False)
+    archived_until = db.Column(db.Date, nullable=False, index=True)
 
 
 class FeesCollection(db.Model):
@@ -183,9 +243,20 @@ class FeesCollection(db.Model):
 
     student = db.relationship('Student', backref='fees_collection', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_fees_collection_student_year', 'student_id', 'academic_year'),
+    )
+
     @property
     def balance(self):
         """Calculate the remaining balance for a student's yearly fee."""
+        ledger = db.session.get(
+            StudentFeeLedger, (self.student_id, self.academic_year), populate_existing=True
+        )
+        if ledger is not None:
+            return ledger.balance
+
+        # Not flushed into the ledger yet, compute it directly
         student = self.student
         yearly_fee = (
             db.session.query(YearlyFees.fee_amount)
@@ -210,6 +281,44 @@ class FeesCollection(db.Model):
         return reference_number
 
 
+class StudentFeeLedger(db.Model):
+    """Running fee totals per student and academic year.
+
+    Maintained by services.fee_ledger whenever fees or yearly fees change.
+    """
+    __tablename__ = 'student_fee_ledger'
+    student_id = db.Column(db.Integer, db.ForeignKey('students.student_id'), primary_key=True)
+    academic_year = db.Column(db.String(9), primary_key=True)  # Format: "2024-2025"
+    total_due = db.Column(db.Float, nullable=False, default=0)
+    total_paid = db.Column(db.Float, nullable=False, default=0)
+    balance = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    def __repr__(self):
+        return f"<StudentFeeLedger {self.student_id} {self.academic_year}: {self.balance}>"
+
+
+class ImportJob(db.Model):
+    """Background fee/grade import, polled by the client for progress."""
+    __tablename__ = 'import_jobs'
+    job_id = db.Column(db.String(36), primary_key=True)
+    kind = db.Column(db.Enum('fees', 'grades'), nullable=False)
+    status = db.Column(db.Enum('queued', 'running', 'finished', 'failed'), nullable=False, default='queued')
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+    imported_rows = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text, nullable=True)  # JSON list of the most recent per-row errors
+    result = db.Column(db.Text, nullable=True)  # JSON response of the finished import
+    result_status = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ImportJob {self.job_id} {self.kind} {self.status}>"
+
+
 class Expense(db.Model):
     __tablename__ = 'expenses'
 
@@ -237,6 +346,62 @@ class YearlyFees(db.Model):
         return f"<YearlyFees {self.academic_year} - {self.grade_level}: {self.fee_amount}>"
         
         
+class CacheVersion(db.Model):
+    """Version counter per cached dataset, bumped whenever the data changes.
+
+    In-process caches compare their version with this row to know when to reload.
+    """
+    __tablename__ = 'cache_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class GradingScale(db.Model):
+    """Letter grade bands for an academic year and grade level.
+
+    A missing academic_year or grade_level makes the scale the fallback for
+    every year or level.
+    """
+    __tablename__ = 'grading_scales'
+    scale_id = db.Column(db.Integer, primary_key=True)
+    academic_year = db.Column(db.String(9), nullable=True)  # Format: "2024-2025"
+    grade_level = db.Column(db.Enum('F1', 'F2', 'F3', 'F4'), nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+    bands = db.relationship(
+        'GradingScaleBand', backref='scale', lazy=True,
+        cascade='all, delete-orphan', order_by='GradingScaleBand.min_percentage.desc()'
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint('academic_year', 'grade_level', name='uq_grading_scales_year_level'),
+    )
+
+    def __repr__(self):
+        return f"<GradingScale {self.academic_year} {self.grade_level} v{self.version}>"
+
+
+class GradingScaleBand(db.Model):
+    __tablename__ = 'grading_scale_bands'
+    band_id = db.Column(db.Integer, primary_key=True)
+    scale_id = db.Column(db.Integer, db.ForeignKey('grading_scales.scale_id'), nullable=False)
+    min_percentage = db.Column(db.Float, nullable=False)
+    grade_letter = db.Column(db.String(2), nullable=False)
+
+
+# Letter grade cutoffs, highest first: a percentage >= cutoff earns the letter
+GRADE_CUTOFFS = [
+    (90, 'A+'),
+    (80, 'A'),
+    (70, 'B'),
+    (60, 'C'),
+    (50, 'D'),
+]
+FAILING_GRADE = 'F'
+
+
 class Grade(db.Model):
     __tablename__ = 'grades'
     
@@ -258,24 +423,25 @@ class Grade(db.Model):
     subject = db.relationship('Subject', backref='grades', lazy=True)
     class_ = db.relationship('Classes', backref='grades', lazy=True)
 
-    def calculate_percentage_and_grade(self):
+    __table_args__ = (
+        db.Index('ix_grades_student_id', 'student_id'),
+        db.Index('ix_grades_class_subject_term', 'class_id', 'subject_id', 'term'),
+        db.Index('ix_grades_subject_term', 'subject_id', 'term'),
+    )
+
+    def calculate_percentage_and_grade(self, scale=None):
         if self.score is not None and self.max_score:
             self.percentage = round((self.score / self.max_score) * 100, 2)
-            self.grade_letter = self.assign_grade_letter(self.percentage)
-
-    def assign_grade_letter(self, percentage):
-        if percentage >= 90:
-            return 'A+'
-        elif percentage >= 80:
-            return 'A'
-        elif percentage >= 70:
-            return 'B'
-        elif percentage >= 60:
-            return 'C'
-        elif percentage >= 50:
-            return 'D'
-        else:
-            return 'F'
+            self.grade_letter = self.assign_grade_letter(self.percentage, scale)
+
+    def assign_grade_letter(self, percentage, scale=None):
+        """Letter for ``percentage``, from a compiled grading scale if one is given."""
+        if scale is not None:
+            return scale.letter_for(percentage)
+        for cutoff, letter in GRADE_CUTOFFS:
+            if percentage >= cutoff:
+                return letter
+        return FAILING_GRADE
 
     def __repr__(self):
         return f"<Grade {self.student_id} {self.subject_id} {self.term} {self.grade_letter}>"
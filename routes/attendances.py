@@ -1,15 +1,35 @@
-from flask import Blueprint
-from flask_restful import reqparse, fields, marshal_with, Resource, Api
-from models import db, Attendance
+from datetime import datetime, date
+from flask import Blueprint, request, current_app
+from flask_restful import reqparse, fields, marshal_with, Resource, Api, abort
+from sqlalchemy.exc import IntegrityError
+from models import db, Attendance, Classes, Student
+from services.attendance import record_roll_call, STATUSES
+from services.attendance_archive import is_archived, archived_until, load_history, STATUS_NAMES
+from services.attendance_rollups import student_attendance_rates, chronic_absentees, class_attendance_trend
+from services.audit import audit
+from services.grading import academic_year_for
 
 attendance_api_bp = Blueprint('attendance_api', __name__)
 api = Api(attendance_api_bp)
 
+
+def parse_attendance_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as e:
+        abort(400, error=f"Invalid date format: {str(e)}. Use YYYY-MM-DD format.")
+
+
+def abort_if_archived(attendance_date):
+    """409 for a date in the archive. Aborts rather than returns, so the error isn't run through marshal_with."""
+    if is_archived(attendance_date):
+        abort(409, message=f"Attendance before {archived_until().isoformat()} is archived and can no longer be changed")
+
 attendance_parser = reqparse.RequestParser()
 attendance_parser.add_argument("student_id", type=int, required=True, help="Student ID is required")
 attendance_parser.add_argument("class_id", type=int, required=True, help="Class ID is required")
 attendance_parser.add_argument("attendance_date", type=str, required=True, help="Attendance date is required (YYYY-MM-DD)")
-attendance_parser.add_argument("status", type=str, required=True, choices=['Present', 'Absent', 'Late'], help="Status must be 'Present', 'Absent', or 'Late'")
+attendance_parser.add_argument("status", type=str, required=True, choices=STATUSES, help="Status must be 'Present', 'Absent', or 'Late'")
 
 attendance_fields = {
     'attendance_id': fields.Integer,
@@ -35,11 +55,17 @@ class AttendanceResource(Resource):
         attendance = Attendance.query.get(attendance_id)
         if not attendance:
             return {"message": "Attendance record not found"}, 404
+        attendance_date = parse_attendance_date(args['attendance_date'])
+        abort_if_archived(attendance_date)
         attendance.student_id = args['student_id']
         attendance.class_id = args['class_id']
-        attendance.attendance_date = args['attendance_date']
+        attendance.attendance_date = attendance_date
         attendance.status = args['status']
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            abort(409, message="Attendance is already recorded for this student, class and date")
         return attendance, 200
 
     def delete(self, attendance_id):
@@ -63,15 +89,190 @@ class AttendanceListResource(Resource):
     def post(self):
         """Create a new attendance record"""
         args = attendance_parser.parse_args()
+        attendance_date = parse_attendance_date(args['attendance_date'])
+        abort_if_archived(attendance_date)
         new_attendance = Attendance(
             student_id=args['student_id'], 
             class_id=args['class_id'], 
-            attendance_date=args['attendance_date'], 
+            attendance_date=attendance_date, 
             status=args['status']
         )
         db.session.add(new_attendance)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            abort(409, message="Attendance is already recorded for this student, class and date")
         return new_attendance, 201
 
+class RollCallResource(Resource):
+    def post(self):
+        """Record a whole class register in one go.
+
+        Body: {"class_id": 1, "attendance_date": "YYYY-MM-DD",
+               "statuses": {"<student_id>": "Present" | "Absent" | "Late", ...}}
+        Submitting the same class and date again updates the statuses.
+        """
+        data = request.get_json(silent=True) or {}
+        statuses = data.get('statuses')
+        if not data.get('class_id') or not data.get('attendance_date') or not isinstance(statuses, dict) or not statuses:
+            return {"message": "class_id, attendance_date and a non-empty statuses object are required"}, 400
+
+        try:
+            class_id = int(data['class_id'])
+            attendance_date = datetime.strptime(data['attendance_date'], '%Y-%m-%d').date()
+            statuses = {int(student_id): status for student_id, status in statuses.items()}
+        except (TypeError, ValueError) as e:
+            return {"error": f"Invalid roll call: {str(e)}. Use numeric ids and YYYY-MM-DD dates."}, 400
+
+        invalid = {student_id: status for student_id, status in statuses.items() if status not in STATUSES}
+        if invalid:
+            return {"message": f"Status must be one of: {', '.join(STATUSES)}", "invalid": invalid}, 400
+
+        if not db.session.get(Classes, class_id):
+            return {"message": "Class not found"}, 404
+        abort_if_archived(attendance_date)
+
+        # One query to check every student belongs to the class
+        enrolled = set(db.session.execute(
+            db.select(Student.student_id)
+            .where(Student.class_id == class_id, Student.student_id.in_(list(statuses)))
+        ).scalars())
+        not_enrolled = sorted(set(statuses) - enrolled)
+        if not_enrolled:
+            return {"message": "Some students are not in this class", "student_ids": not_enrolled}, 400
+
+        record_roll_call(class_id, attendance_date, statuses)
+        audit("ROLL_CALL", f"Recorded attendance of {len(statuses)} students of class {class_id} for {attendance_date}")
+        db.session.commit()
+
+        return {
+            "message": f"Attendance recorded for {len(statuses)} students",
+            "class_id": class_id,
+            "attendance_date": attendance_date.isoformat(),
+            "recorded": len(statuses),
+        }, 200
+
+
+def parse_month(value):
+    """Turn a YYYY-MM query parameter into a (year, month) pair."""
+    if not value:
+        return None
+    month = datetime.strptime(value, '%Y-%m')
+    return month.year, month.month
+
+
+def parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+class AttendanceRatesResource(Resource):
+    def get(self):
+        """Attendance percentage of each student, from the monthly rollups.
+
+        Filters: class_id, student_id, and from/to months (YYYY-MM, both included).
+        Late counts as attended.
+        """
+        try:
+            start_month = parse_month(request.args.get('from'))
+            end_month = parse_month(request.args.get('to'))
+        except ValueError as e:
+            return {"error": f"Invalid month: {str(e)}. Use YYYY-MM format."}, 400
+        return student_attendance_rates(
+            start_month,
+            end_month,
+            class_id=request.args.get('class_id', type=int),
+            student_id=request.args.get('student_id', type=int),
+        ), 200
+
+
+class ChronicAbsenceResource(Resource):
+    def get(self):
+        """Students absent on at least ?threshold= percent of their recorded days, most absent first.
+
+        Filters: class_id, from/to months (YYYY-MM), and min_days, the fewest
+        recorded days a student needs to be listed.
+        """
+        threshold = request.args.get('threshold', type=float)
+        if threshold is None:
+            threshold = current_app.config['CHRONIC_ABSENCE_THRESHOLD']
+        try:
+            start_month = parse_month(request.args.get('from'))
+            end_month = parse_month(request.args.get('to'))
+        except ValueError as e:
+            return {"error": f"Invalid month: {str(e)}. Use YYYY-MM format."}, 400
+        return {
+            "threshold": threshold,
+            "students": chronic_absentees(
+                threshold,
+                start_month,
+                end_month,
+                class_id=request.args.get('class_id', type=int),
+                min_days=request.args.get('min_days', 1, type=int),
+            ),
+        }, 200
+
+
+class AttendanceTrendResource(Resource):
+    def get(self):
+        """Attendance of one class (?class_id=) or the whole school per day or ?period=month.
+
+        Filters: from/to dates (YYYY-MM-DD, both included).
+        """
+        period = request.args.get('period', 'day')
+        if period not in ('day', 'month'):
+            return {"message": "period must be 'day' or 'month'"}, 400
+        try:
+            start_date = parse_day(request.args.get('from'))
+            end_date = parse_day(request.args.get('to'))
+        except ValueError as e:
+            return {"error": f"Invalid date format: {str(e)}. Use YYYY-MM-DD format."}, 400
+        return class_attendance_trend(
+            start_date,
+            end_date,
+            class_id=request.args.get('class_id', type=int),
+            period=period,
+        ), 200
+
+
+class AttendanceHistoryResource(Resource):
+    def get(self, student_id):
+        """Counts and streaks of a student's attendance over an academic year.
+
+        Reads the bitmap archive and the Attendance rows not archived yet.
+        Parameters: academic_year (default the current one), from/to dates
+        (YYYY-MM-DD, both included), streak_status (default Absent) and
+        min_streak, the shortest run of school days reported (default 2).
+        """
+        if not db.session.get(Student, student_id):
+            return {"message": "Student not found"}, 404
+        streak_status = request.args.get('streak_status', 'Absent')
+        if streak_status not in STATUS_NAMES.values():
+            return {"message": f"streak_status must be one of: {', '.join(STATUSES)}"}, 400
+        academic_year = request.args.get('academic_year') or academic_year_for(date.today())
+        try:
+            start_date = parse_day(request.args.get('from'))
+            end_date = parse_day(request.args.get('to'))
+            history = load_history(student_id, academic_year)
+        except ValueError as e:
+            return {"error": f"Invalid parameter: {str(e)}. Use YYYY-MM-DD dates and YYYY-YYYY academic years."}, 400
+
+        return {
+            "student_id": student_id,
+            "academic_year": academic_year,
+            "counts": history.counts(start_date, end_date),
+            "streaks": history.streaks(
+                streak_status,
+                min_length=request.args.get('min_streak', 2, type=int),
+                start=start_date,
+                end=end_date,
+            ),
+        }, 200
+
 api.add_resource(AttendanceListResource, '/attendance')
+api.add_resource(RollCallResource, '/attendance/roll_call')
+api.add_resource(AttendanceRatesResource, '/attendance/rates')
+api.add_resource(ChronicAbsenceResource, '/attendance/chronic_absence')
+api.add_resource(AttendanceTrendResource, '/attendance/trends')
+api.add_resource(AttendanceHistoryResource, '/attendance/history/<int:student_id>')
 api.add_resource(AttendanceResource, '/attendance/<int:attendance_id>')
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, current_app
+from models import db, AuditLog
+from services.rbac import require_permission
+
+audit_bp = Blueprint('audit_logs', __name__)
+
+
+def parse_cursor(cursor):
+    """The log_id of an X-Next-Cursor value, also accepting the older "<created_at>_<log_id>" form."""
+    return int(cursor.rpartition('_')[2])
+
+
+@audit_bp.route('/audit_logs', methods=['GET'])
+@require_permission("view_audit_logs")
+def list_audit_logs():
+    """List audit log entries, newest first, a page at a time.
+
+    Filters: user_id, action, since and until (ISO dates or datetimes, until
+    exclusive). Pass the X-Next-Cursor header of a response as ?after= to get
+    the next page.
+    """
+    limit = max(1, min(request.args.get('limit', type=int) or current_app.config['AUDIT_PAGE_SIZE'], 1000))
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since = datetime.fromisoformat(since) if since else None
+        until = datetime.fromisoformat(until) if until else None
+        after = parse_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return jsonify({"message": f"Invalid parameter: {e}"}), 400
+
+    query = db.session.query(
+        AuditLog.log_id,
+        AuditLog.user_id,
+        AuditLog.action,
+        AuditLog.description,
+        AuditLog.created_at,
+    )
+
+    # Equality filters first, so (user_id, created_at) or (action, created_at) serves the range
+    user_id = request.args.get('user_id', type=int)
+    if user_id is not None:
+        query = query.filter(AuditLog.user_id == user_id)
+    action = request.args.get('action')
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if since:
+        query = query.filter(AuditLog.created_at >= since)
+    if until:
+        query = query.filter(AuditLog.created_at < until)
+    if after:
+        query = query.filter(AuditLog.log_id < after)
+
+    # Paged on log_id alone, it follows insertion order. created_at doesn't
+    # make a usable key: on SQLite server defaults are stored to the second
+    # but bound datetimes with microseconds, so they compare wrongly as text.
+    # Fetch one extra row to know whether there is another page
+    rows = query.order_by(AuditLog.log_id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = jsonify([
+        {
+            "log_id": row.log_id,
+            "user_id": row.user_id,
+            "action": row.action,
+            "description": row.description,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+        for row in rows
+    ])
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(rows[-1].log_id)
+    return response
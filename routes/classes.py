@@ -2,6 +2,7 @@ from datetime import datetime
 from flask import Blueprint
 from flask_restful import reqparse, fields, marshal_with, Resource, Api
 from models import db, Classes
+from services.list_query import ListQuery
 
 # Define Blueprint and API
 classes_bp = Blueprint("classes", __name__)
@@ -57,12 +58,13 @@ class ClassesResource(Resource):
         return {"message": "Class deleted"}, 200
 
 # Resource for handling a list of classes
+classes_list = ListQuery(Classes, classes_fields, sort_keys=('name',))
+
+
 class ClassesListResource(Resource):
-    @marshal_with(classes_fields)
     def get(self):
-        """Get all classes"""
-        classes = Classes.query.all()
-        return classes
+        """List classes a page at a time"""
+        return classes_list.page(Classes.query)
 
     @marshal_with(classes_fields)
     def post(self):
@@ -1,6 +1,8 @@
 from flask import Blueprint, request
 from flask_restful import reqparse, fields, marshal_with, Resource, Api
 from models import db, Expense
+from services.audit import audit
+from services.list_query import ListQuery
 from werkzeug.utils import secure_filename
 import os
 import datetime
@@ -36,11 +38,16 @@ expense_fields = {
 }
 
 # -------- Resources --------
+expense_list = ListQuery(
+    Expense, expense_fields,
+    sort_keys=('expense_date', 'amount', 'expense_type'),
+    default_sort='-expense_date',
+)
+
+
 class ExpenseListResource(Resource):
-    @marshal_with(expense_fields)
     def get(self):
-        expenses = Expense.query.order_by(Expense.expense_date.desc()).all()
-        return expenses
+        return expense_list.page(Expense.query)
 
     @marshal_with(expense_fields)
     def post(self):
@@ -61,6 +68,7 @@ class ExpenseListResource(Resource):
             attachment=filename
         )
         db.session.add(expense)
+        audit("CREATE_EXPENSE", f"Recorded {expense.expense_type} expense of {expense.amount} on {expense.expense_date}")
         db.session.commit()
         return expense, 201
 
@@ -88,11 +96,13 @@ class ExpenseResource(Resource):
             file.save(os.path.join(UPLOAD_FOLDER, filename))
             expense.attachment = filename
 
+        audit("UPDATE_EXPENSE", f"Updated expense {expense.expense_id}")
         db.session.commit()
         return expense
 
     def delete(self, expense_id):
         expense = Expense.query.get_or_404(expense_id)
+        audit("DELETE_EXPENSE", f"Deleted {expense.expense_type} expense {expense.expense_id} of {expense.amount}", sync=True)
         db.session.delete(expense)
         db.session.commit()
         return {'message': 'Expense deleted successfully'}
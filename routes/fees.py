@@ -1,20 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_restful import reqparse, fields, marshal_with, Resource, Api, marshal
 from models import db, FeesCollection, Student, YearlyFees
-
-
-from datetime import datetime, date
-
-def to_python_date(value):
-    if not value:
-        return date.today()  # fallback
-    try:
-        # Remove 'Z', handle ISO format
-        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
-        return dt.date()
-    except Exception as e:
-        print(f"Invalid date: {value}, error: {e}")
-        return date.today()
+from services.audit import audit
+from services.fee_balances import fee_balances
+from services.fee_import import FeeImport, to_python_date
+from services.list_query import ListQuery
+from services.name_search import filter_student_names
+from services.spreadsheets import UnreadableFile, iter_upload_rows
+from services.import_jobs import submit_import
+from routes.import_jobs import accepted_job_response
 
 # Define the Blueprint
 fees_bp = Blueprint("fees", __name__)
@@ -63,6 +57,7 @@ class FeeResource(Resource):
         fee.payment_date = args['payment_date']
         fee.payment_method = args['payment_method']
         fee.academic_year = args['academic_year']
+        audit("UPDATE_FEE", f"Updated fee payment {fee.reference_number} of student {fee.student_id}")
         db.session.commit()
         return fee, 200
 
@@ -70,32 +65,42 @@ class FeeResource(Resource):
         fee = FeesCollection.query.get(fee_id)
         if not fee:
             return {"message": "Fee entry not found"}, 404
+        audit("DELETE_FEE", f"Deleted fee payment {fee.reference_number} of {fee.amount_paid} for student {fee.student_id}", sync=True)
         db.session.delete(fee)
         db.session.commit()
         return {"message": "Fee entry deleted"}, 200
 
+fee_list = ListQuery(
+    FeesCollection, fees_fields,
+    sort_keys=('payment_date', 'amount_paid', 'academic_year', 'student_id'),
+    field_columns={
+        'student_name': [FeesCollection.student_id],
+        'status': [FeesCollection.amount_paid],
+    },
+    field_options={
+        'student_name': [db.joinedload(FeesCollection.student).load_only(Student.first_name, Student.last_name)],
+    },
+)
+
 # Resource for the List of Fees
 class FeeListResource(Resource):
-    @marshal_with(fees_fields)
     def get(self):
         """Get all fees with optional filtering by academic year, first name, or last name"""
         academic_year = request.args.get('academic_year')
         first_name = request.args.get('first_name')
         last_name = request.args.get('last_name')
 
-        query = FeesCollection.query.options(db.joinedload(FeesCollection.student))
+        query = FeesCollection.query
 
         if academic_year:
             query = query.filter(FeesCollection.academic_year == academic_year)
 
-        if first_name:
-            query = query.filter(Student.first_name.ilike(f"%{first_name}%"))
-
-        if last_name:
-            query = query.filter(Student.last_name.ilike(f"%{last_name}%"))
+        if first_name or last_name:
+            # Name filters need students in the FROM clause, joined on the payment's student
+            query = query.join(Student, FeesCollection.student_id == Student.student_id)
+            query = filter_student_names(query, first_name=first_name, last_name=last_name)
 
-        fees = query.all()
-        return fees, 200
+        return fee_list.page(query)
 
     @marshal_with(fees_fields)
     def post(self):
@@ -109,6 +114,7 @@ class FeeListResource(Resource):
             academic_year=args['academic_year'],
         )
         db.session.add(new_fee)
+        audit("CREATE_FEE", f"Recorded fee payment {new_fee.reference_number} of {new_fee.amount_paid} for student {new_fee.student_id}")
         db.session.commit()
         return new_fee, 201
 
@@ -123,30 +129,16 @@ def fees_collection_with_balances():
     if not grade_level:
         return jsonify({"message": "grade_level query parameter is required"}), 400
 
-    students = Student.query.filter_by(grade_level=grade_level).all()
-    yearly_fees = YearlyFees.query.filter_by(grade_level=grade_level).all()
-
-    results = []
-
-    for student in students:
-        for yf in yearly_fees:
-            # Get all fees paid by this student for this academic year
-            total_paid = sum(
-                f.amount_paid for f in student.fees_collection
-                if f.academic_year == yf.academic_year
-            )
+    academic_year = request.args.get('academic_year')
+    class_id = request.args.get('class_id', type=int)
+    outstanding_only = request.args.get('outstanding', 'false').lower() == 'true'
 
-            balance = yf.fee_amount - total_paid
-
-            results.append({
-                "student_id": student.student_id,
-                "student_name": f"{student.first_name} {student.last_name}",
-                "academic_year": yf.academic_year,
-                "grade_level": grade_level,
-                "total_fee": yf.fee_amount,
-                "total_paid": total_paid,
-                "balance": balance
-            })
+    results = fee_balances(
+        grade_level,
+        academic_year=academic_year,
+        class_id=class_id,
+        outstanding_only=outstanding_only,
+    )
 
     return jsonify(results)
 
@@ -158,61 +150,32 @@ def import_fees():
     if not data:
         return jsonify({"message": "No data provided"}), 400
 
-    imported_entries = []
-    errors = []
-
-    for idx, item in enumerate(data):
-        student_id = item.get('student_id')
-        academic_year = item.get('academic_year')
-        amount_paid = item.get('amount_paid')
-        reference_number = item.get('reference_number') or f"REF-{student_id}-{academic_year}"
-
-        # Skip incomplete rows
-        if not all([student_id, academic_year, amount_paid is not None]):
-            errors.append({
-                "index": idx,
-                "reference_number": reference_number,
-                "error": "Missing required fields"
-            })
-            continue
-        
-        # Check for duplicate reference_number in DB
-        existing_fee = FeesCollection.query.filter_by(reference_number=reference_number).first()
-        if existing_fee:
-            errors.append({
-                "index": idx,
-                "reference_number": reference_number,
-                "error": "Duplicate reference number"
-            })
-            continue
+    chunk_size = request.args.get('chunk_size', type=int) or current_app.config['FEE_IMPORT_CHUNK_SIZE']
+    if request.args.get('async', 'false').lower() == 'true':
+        return accepted_job_response(submit_import('fees', chunk_size, rows=data))
+
+    response, status = FeeImport(chunk_size=chunk_size).run(data).response()
+    return jsonify(response), status
 
-        new_fee = FeesCollection(
-            student_id=student_id,
-            reference_number=reference_number,
-            amount_paid=amount_paid,
-            payment_date=to_python_date(item.get('payment_date')),
-            payment_method=item.get('payment_method') or 'Imported',
-            academic_year=academic_year,
-        )
-        db.session.add(new_fee)
-        imported_entries.append({
-            "student_id": student_id,
-            "academic_year": academic_year,
-            "amount_paid": amount_paid,
-            "reference_number": reference_number
-        })
-
-    if imported_entries:
-        db.session.commit()
 
-    response = {
-        "message": f"{len(imported_entries)} fee entries imported successfully",
-        "imported_entries": imported_entries,
-    }
-    if errors:
-        response["errors"] = errors
+@fees_bp.route('/import_fees/upload', methods=['POST'])
+def upload_fees():
+    """Import fees from an uploaded CSV or XLSX file, streamed row by row."""
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({"message": "No file provided"}), 400
+
+    chunk_size = request.args.get('chunk_size', type=int) or current_app.config['FEE_IMPORT_CHUNK_SIZE']
+    try:
+        if request.args.get('async', 'false').lower() == 'true':
+            return accepted_job_response(submit_import('fees', chunk_size, upload=file))
+        rows = iter_upload_rows(file)
+    except UnreadableFile as e:
+        return jsonify({"message": f"Could not read file: {e}"}), 400
 
-    return jsonify(response), 201 if imported_entries else 400
+    # Rows the file breaks at are reported with the rest of the import's errors
+    response, status = FeeImport(chunk_size=chunk_size).run(rows).response()
+    return jsonify(response), status
 
 
 
@@ -245,6 +208,7 @@ class YearlyFeesResource(Resource):
         fee.academic_year = args['academic_year']
         fee.grade_level = args['grade_level']
         fee.fee_amount = args['fee_amount']
+        audit("UPDATE_YEARLY_FEE", f"Set {fee.grade_level} fee for {fee.academic_year} to {fee.fee_amount}")
         db.session.commit()
         return fee, 200
     
@@ -253,6 +217,7 @@ class YearlyFeesResource(Resource):
         fee = YearlyFees.query.get(fee_id)
         if not fee:
             return {"message": "Yearly fee not found"}, 404
+        audit("DELETE_YEARLY_FEE", f"Deleted {fee.grade_level} fee for {fee.academic_year}", sync=True)
         db.session.delete(fee)
         db.session.commit()
         return {"message": "Deleted successfully"}, 200
@@ -280,6 +245,7 @@ class YearlyFeesListResource(Resource):
             fee_amount=args['fee_amount']
         )
         db.session.add(new_fee)
+        audit("CREATE_YEARLY_FEE", f"Set {new_fee.grade_level} fee for {new_fee.academic_year} to {new_fee.fee_amount}")
         db.session.commit()
         return marshal(new_fee, yearly_fees_field), 201
 
@@ -1,15 +1,19 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import (
     jwt_required
 )
 from flask.views import MethodView
 from app import db
 from models import Grade, Student, Subject
-import pandas as pd
 from io import BytesIO
 from datetime import datetime, date
-from openpyxl import load_workbook
+from openpyxl import Workbook
 from openpyxl.worksheet.datavalidation import DataValidation
+from services.audit import audit
+from services.grade_import import GradeImport
+from services.spreadsheets import UnreadableFile, iter_upload_rows
+from services.import_jobs import submit_import
+from routes.import_jobs import accepted_job_response
 
 def to_python_date(value):
     if not value:
@@ -26,26 +30,66 @@ grades_bp = Blueprint('grades', __name__)
 
 # --- Grade API (CRUD + List) ---
 class GradeAPI(MethodView):
+    filters = ('class_id', 'subject_id', 'term', 'exam_type', 'student_id')
+
     @jwt_required()
     def get(self):
-        grades = Grade.query.all()
+        """List grades a page at a time, ordered by grade_id.
+
+        Pass the X-Next-Cursor header of a response as ?after= to get the next page.
+        """
+        after = request.args.get('after', type=int)
+        limit = max(1, min(request.args.get('limit', type=int) or current_app.config['GRADES_PAGE_SIZE'], 1000))
+
+        # One joined query, selecting only the columns that are serialized
+        query = (
+            db.session.query(
+                Grade.grade_id,
+                Grade.term,
+                Grade.exam_type,
+                Grade.score,
+                Grade.max_score,
+                Grade.percentage,
+                Grade.grade_letter,
+                Grade.remarks,
+                Grade.exam_date,
+                Student.student_id,
+                Student.first_name,
+                Student.last_name,
+                Student.class_id,
+                Subject.subject_id,
+                Subject.name.label('subject_name'),
+            )
+            .join(Student, Student.student_id == Grade.student_id)
+            .join(Subject, Subject.subject_id == Grade.subject_id)
+        )
 
-        results = []
-        for g in grades:
-            student = Student.query.get(g.student_id)
-            subject = Subject.query.get(g.subject_id)
+        for name in self.filters:
+            value = request.args.get(name)
+            if value:
+                query = query.filter(getattr(Grade, name) == value)
+
+        if after:
+            query = query.filter(Grade.grade_id > after)
+
+        # Fetch one extra row to know whether there is another page
+        rows = query.order_by(Grade.grade_id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
+        results = []
+        for g in rows:
             results.append({
                 'grade_id': g.grade_id,
                 'student': {
-                    'student_id': student.student_id,
-                    'first_name': student.first_name,
-                    'last_name': student.last_name,
-                    'class_id': student.class_id
+                    'student_id': g.student_id,
+                    'first_name': g.first_name,
+                    'last_name': g.last_name,
+                    'class_id': g.class_id
                 },
                 'subject': {
-                    'subject_id': subject.subject_id,
-                    'name': subject.name,
+                    'subject_id': g.subject_id,
+                    'name': g.subject_name,
                 },
                 'term': g.term,
                 'exam_type': g.exam_type,
@@ -57,12 +101,16 @@ class GradeAPI(MethodView):
                 'exam_date': g.exam_date.strftime('%Y-%m-%d') if g.exam_date else None
             })
 
-        return jsonify(results)
+        response = jsonify(results)
+        if has_more:
+            response.headers['X-Next-Cursor'] = str(rows[-1].grade_id)
+        return response
     
 # --- Single Grade (DELETE) ---
 class SingleGradeAPI(MethodView):
     def delete(self, grade_id):
         grade = Grade.query.get_or_404(grade_id)
+        audit("DELETE_GRADE", f"Deleted {grade.term} {grade.exam_type} grade of student {grade.student_id} in subject {grade.subject_id}")
         db.session.delete(grade)
         db.session.commit()
         return jsonify({'message': 'Grade deleted successfully'})
@@ -74,113 +122,66 @@ class ImportGradesAPI(MethodView):
         if not data:
             return jsonify({"message": "No data provided"}), 400
 
-        imported_entries = []
-        errors = []
-
-        for idx, item in enumerate(data):
-            try:
-                student_id = int(item.get('student_id'))
-                subject_id = int(item.get('subject_id'))
-                class_id = int(item.get('class_id'))
-                term = item.get('term')
-                exam_type = item.get('exam_type')
-                score = int(item.get('score'))
-                max_score = int(item.get('max_score'))
-                remarks = item.get('remarks')
-                exam_date = datetime.strptime(item.get('exam_date'), "%d/%m/%Y").date()
-
-
-                # Validate required fields
-                if not all([student_id, subject_id, class_id, term, exam_type, score is not None, max_score is not None]):
-                    errors.append({
-                        "index": idx,
-                        "student_id": student_id,
-                        "error": "Missing required fields"
-                    })
-                    continue
-
-                grade = Grade(
-                    student_id=student_id,
-                    subject_id=subject_id,
-                    class_id=class_id,
-                    term=term,
-                    exam_type=exam_type,
-                    score=score,
-                    max_score=max_score,
-                    remarks=remarks,
-                    exam_date=exam_date
-                )
-                grade.calculate_percentage_and_grade()
-                db.session.add(grade)
-
-                imported_entries.append({
-                    "student_id": student_id,
-                    "subject_id": subject_id,
-                    "term": term,
-                    "score": score
-                })
-            except Exception as e:
-                errors.append({
-                    "index": idx,
-                    "student_id": item.get('student_id'),
-                    "error": str(e)
-                })
-
-        if imported_entries:
-            db.session.commit()
-
-        response = {
-            "message": f"{len(imported_entries)} grade entries imported successfully",
-            "imported_entries": imported_entries
-        }
-        if errors:
-            response["errors"] = errors
-
-        return jsonify(response), 201 if imported_entries else 400
+        chunk_size = request.args.get('chunk_size', type=int) or current_app.config['GRADE_IMPORT_CHUNK_SIZE']
+        if request.args.get('async', 'false').lower() == 'true':
+            return accepted_job_response(submit_import('grades', chunk_size, rows=data))
+
+        response, status = GradeImport(chunk_size=chunk_size).run(data).response()
+        return jsonify(response), status
+
+
+# --- Import grades from an uploaded CSV/XLSX file ---
+class UploadGradesAPI(MethodView):
+    def post(self):
+        file = request.files.get('file')
+        if not file or not file.filename:
+            return jsonify({"message": "No file provided"}), 400
+
+        chunk_size = request.args.get('chunk_size', type=int) or current_app.config['GRADE_IMPORT_CHUNK_SIZE']
+        try:
+            if request.args.get('async', 'false').lower() == 'true':
+                return accepted_job_response(submit_import('grades', chunk_size, upload=file))
+            rows = iter_upload_rows(file)
+        except UnreadableFile as e:
+            return jsonify({"message": f"Could not read file: {e}"}), 400
+
+        # Rows the file breaks at are reported with the rest of the import's errors
+        response, status = GradeImport(chunk_size=chunk_size).run(rows).response()
+        return jsonify(response), status
     
 
 class ExportGradesAPI(MethodView):
+    columns = [
+        'student_id', 'student_name', 'subject_id', 'subject_name', 'class_id',
+        'term', 'exam_type', 'score', 'max_score', 'remarks', 'exam_date',
+    ]
+
     def get(self, subject_id):
-        students = Student.query.all()
         subject = Subject.query.get(subject_id)
+        if not subject:
+            return jsonify({'error': 'No students or subject found'}), 404
 
-        if not students or not subject:
+        # Only the students taking this subject's grade level (optionally one class)
+        roster = (
+            db.session.query(Student.student_id, Student.first_name, Student.last_name, Student.class_id)
+            .filter(Student.grade_level == subject.grade_level)
+            .order_by(Student.student_id)
+        )
+        class_id = request.args.get('class_id', type=int)
+        if class_id:
+            roster = roster.filter(Student.class_id == class_id)
+
+        if not db.session.query(roster.exists()).scalar():
             return jsonify({'error': 'No students or subject found'}), 404
 
         # Dropdown options (move here)
         term_values = ['Term 1', 'Term 2', 'Term 3']
         exam_type_values = ['Midterm', 'Final', 'Quiz', 'Assignment']
 
-        # Prepare rows (no dropdowns inserted here!)
-        rows = []
-        for student in students:
-            rows.append({
-                'student_id': student.student_id,
-                'student_name': f"{student.first_name} {student.last_name}",
-                'subject_id': subject.subject_id,
-                'subject_name': subject.name,
-                'class_id': student.class_id,
-                'term': '',         # leave empty
-                'exam_type': '',    # leave empty
-                'score': '',
-                'max_score': '',
-                'remarks': '',
-                'exam_date': ''
-            })
+        # Write-only mode streams rows straight to the file in a single pass
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Grades')
 
-        df = pd.DataFrame(rows)
-
-        # Write to Excel buffer using pandas
-        temp_buffer = BytesIO()
-        with pd.ExcelWriter(temp_buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Grades')
-        temp_buffer.seek(0)
-
-        # Load workbook with openpyxl
-        wb = load_workbook(temp_buffer)
-        ws = wb['Grades']
-
-        # Create data validations
         term_validation = DataValidation(
             type="list",
             formula1=f'"{",".join(term_values)}"',
@@ -191,16 +192,26 @@ class ExportGradesAPI(MethodView):
             formula1=f'"{",".join(exam_type_values)}"',
             showDropDown=True
         )
-
-        # Add validations to sheet
-        ws.add_data_validation(term_validation)
-        ws.add_data_validation(exam_type_validation)
+        ws.data_validations.append(term_validation)
+        ws.data_validations.append(exam_type_validation)
+
+        ws.append(self.columns)
+        count = 0
+        for student in roster.yield_per(1000):
+            ws.append([
+                student.student_id,
+                f"{student.first_name} {student.last_name}",
+                subject.subject_id,
+                subject.name,
+                student.class_id,
+                '', '', '', '', '', '',  # term, exam_type, score, max_score, remarks, exam_date
+            ])
+            count += 1
 
         # Apply to proper ranges (F = term, G = exam_type)
-        term_validation.add(f'F2:F{len(rows)+1}')
-        exam_type_validation.add(f'G2:G{len(rows)+1}')
+        term_validation.add(f'F2:F{count+1}')
+        exam_type_validation.add(f'G2:G{count+1}')
 
-        # Finalize
         output = BytesIO()
         wb.save(output)
         output.seek(0)
@@ -216,4 +227,5 @@ class ExportGradesAPI(MethodView):
 grades_bp.add_url_rule('/grades', view_func=GradeAPI.as_view('grades'))
 grades_bp.add_url_rule('/grades/<int:grade_id>', view_func=SingleGradeAPI.as_view('grade_detail'))
 grades_bp.add_url_rule('/grades/import', view_func=ImportGradesAPI.as_view('import_grades'))
+grades_bp.add_url_rule('/grades/import/upload', view_func=UploadGradesAPI.as_view('upload_grades'))
 grades_bp.add_url_rule('/grades/export/<int:subject_id>', view_func=ExportGradesAPI.as_view('export_grades'))
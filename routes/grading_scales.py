@@ -0,0 +1,132 @@
+from flask import Blueprint, request
+from flask_restful import reqparse, fields, marshal_with, Resource, Api, abort
+from sqlalchemy.exc import IntegrityError
+from models import db, GradingScale, GradingScaleBand
+
+grading_scale_bp = Blueprint('grading_scales', __name__)
+api = Api(grading_scale_bp)
+
+grading_scale_parser = reqparse.RequestParser()
+grading_scale_parser.add_argument("academic_year", type=str, required=False, help="Academic year, e.g. 2024-2025 (omit for every year)")
+grading_scale_parser.add_argument("grade_level", type=str, required=False, choices=['F1', 'F2', 'F3', 'F4'], help="Grade level must be F1, F2, F3, or F4 (omit for every level)")
+
+band_fields = {
+    'min_percentage': fields.Float,
+    'grade_letter': fields.String,
+}
+
+grading_scale_fields = {
+    'scale_id': fields.Integer,
+    'academic_year': fields.String,
+    'grade_level': fields.String,
+    'version': fields.Integer,
+    'bands': fields.List(fields.Nested(band_fields)),
+}
+
+
+def parse_bands():
+    """Bands from the JSON body: [{"min_percentage": 90, "grade_letter": "A+"}, ...]"""
+    data = request.get_json(silent=True) or {}
+    bands = data.get('bands')
+    if not bands or not isinstance(bands, list):
+        raise ValueError("bands is required")
+
+    parsed = []
+    for band in bands:
+        try:
+            min_percentage = float(band['min_percentage'])
+            grade_letter = str(band['grade_letter'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Each band needs a numeric min_percentage and a grade_letter")
+        if not grade_letter or len(grade_letter) > 2:
+            raise ValueError("grade_letter must be 1 or 2 characters")
+        parsed.append(GradingScaleBand(min_percentage=min_percentage, grade_letter=grade_letter))
+
+    if len({band.min_percentage for band in parsed}) != len(parsed):
+        raise ValueError("min_percentage values must be unique")
+    return parsed
+
+
+class GradingScaleResource(Resource):
+    @marshal_with(grading_scale_fields)
+    def get(self, scale_id):
+        """Get a specific grading scale by ID"""
+        scale = GradingScale.query.get(scale_id)
+        if not scale:
+            return {"message": "Grading scale not found"}, 404
+        return scale
+
+    @marshal_with(grading_scale_fields)
+    def put(self, scale_id):
+        """Replace the bands of a grading scale, and its academic year or grade level if sent"""
+        args = grading_scale_parser.parse_args()
+        scale = GradingScale.query.get(scale_id)
+        if not scale:
+            abort(404, message="Grading scale not found")
+        try:
+            bands = parse_bands()
+        except ValueError as e:
+            abort(400, message=str(e))
+
+        # Only fields that were sent, leaving one out must not widen the scale to every year or level
+        sent = set(request.get_json(silent=True) or {}) | set(request.values)
+        scope = {field: args[field] if field in sent else getattr(scale, field) for field in ('academic_year', 'grade_level')}
+        clash = GradingScale.query.filter(GradingScale.scale_id != scale_id).filter_by(**scope).first()
+        if clash:
+            abort(409, message="A grading scale for this academic year and grade level already exists.")
+
+        scale.academic_year = scope['academic_year']
+        scale.grade_level = scope['grade_level']
+        scale.bands = bands
+        scale.version += 1
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Created by a concurrent request since the check above
+            db.session.rollback()
+            abort(409, message="A grading scale for this academic year and grade level already exists.")
+        return scale, 200
+
+    def delete(self, scale_id):
+        """Delete a grading scale"""
+        scale = GradingScale.query.get(scale_id)
+        if not scale:
+            return {"message": "Grading scale not found"}, 404
+        db.session.delete(scale)
+        db.session.commit()
+        return {"message": "Grading scale deleted"}, 200
+
+
+class GradingScaleListResource(Resource):
+    @marshal_with(grading_scale_fields)
+    def get(self):
+        """Get all grading scales"""
+        return GradingScale.query.options(db.selectinload(GradingScale.bands)).all()
+
+    @marshal_with(grading_scale_fields)
+    def post(self):
+        """Create a grading scale"""
+        args = grading_scale_parser.parse_args()
+        existing = GradingScale.query.filter_by(
+            academic_year=args['academic_year'],
+            grade_level=args['grade_level']
+        ).first()
+        if existing:
+            return {"message": "A grading scale for this academic year and grade level already exists. Please use PUT to update it."}, 409
+        try:
+            bands = parse_bands()
+        except ValueError as e:
+            return {"message": str(e)}, 400
+
+        scale = GradingScale(
+            academic_year=args['academic_year'],
+            grade_level=args['grade_level'],
+            bands=bands
+        )
+        db.session.add(scale)
+        db.session.commit()
+        return scale, 201
+
+
+api.add_resource(GradingScaleListResource, '/grading_scales')
+api.add_resource(GradingScaleResource, '/grading_scales/<int:scale_id>')
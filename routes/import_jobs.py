@@ -0,0 +1,35 @@
+from flask import Blueprint, jsonify, url_for
+from models import db, ImportJob
+from services.import_jobs import job_to_dict
+
+import_jobs_bp = Blueprint('import_jobs', __name__)
+
+
+def accepted_job_response(job):
+    """202 response returned when an import is submitted with ?async=true."""
+    body = job_to_dict(job)
+    body["status_url"] = url_for('import_jobs.get_import_job', job_id=job.job_id)
+    body["result_url"] = url_for('import_jobs.get_import_job_result', job_id=job.job_id)
+    return jsonify(body), 202
+
+
+@import_jobs_bp.route('/import_jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    """Progress of a background import: rows processed and the most recent errors."""
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({"message": "Import job not found"}), 404
+    return jsonify(job_to_dict(job))
+
+
+@import_jobs_bp.route('/import_jobs/<job_id>/result', methods=['GET'])
+def get_import_job_result(job_id):
+    """Final response of a background import, same as the synchronous endpoint."""
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({"message": "Import job not found"}), 404
+    if job.status == 'failed':
+        return jsonify({"message": f"Import failed: {job.message}"}), 500
+    if job.status != 'finished':
+        return jsonify({"message": f"Import is {job.status}", "processed_rows": job.processed_rows or 0}), 409
+    return job.result, job.result_status, {'Content-Type': 'application/json'}
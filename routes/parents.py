@@ -2,6 +2,7 @@ from flask import Blueprint
 from flask_restful import reqparse, fields, marshal_with
 from models import db, Parent, ParentStudent, Student, User
 from flask_restful import Resource, Api, reqparse, fields, marshal_with
+from services.list_query import ListQuery
 
 parent_bp = Blueprint("parents", __name__)
 api = Api(parent_bp)
@@ -68,12 +69,13 @@ class ParentResource(Resource):
         return {"message": "Parent deleted successfully"}, 200
 
 
+parent_list = ListQuery(Parent, parent_fields, sort_keys=('first_name', 'last_name', 'user_id'))
+
+
 class ParentListResource(Resource):
-    @marshal_with(parent_fields)
     def get(self):
-        """Get all parents"""
-        parents = Parent.query.all()
-        return parents
+        """List parents a page at a time"""
+        return parent_list.page(Parent.query)
 
     @marshal_with(parent_fields)
     def post(self):
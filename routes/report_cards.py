@@ -0,0 +1,103 @@
+from datetime import date
+
+from flask import Blueprint, Response, request, jsonify, send_file, current_app
+from flask_jwt_extended import jwt_required
+
+from services.grading import academic_year_for
+from services.report_cards import TERMS, compute_report_cards, student_report_card, broadsheet_workbook
+from services.report_card_pdfs import prepare_report_cards, claim_render_batch, stream_zip
+
+report_cards_bp = Blueprint('report_cards', __name__)
+
+
+def term_and_year():
+    """The ?term= and ?academic_year= (default the current one) parameters, or an error message."""
+    term = request.args.get('term')
+    if term not in TERMS:
+        return None, None, f"term must be one of: {', '.join(TERMS)}"
+    academic_year = request.args.get('academic_year') or academic_year_for(date.today())
+    first, _, second = academic_year.partition('-')
+    if not (first.isdigit() and second.isdigit() and int(second) == int(first) + 1):
+        return None, None, "academic_year must look like 2024-2025"
+    return term, academic_year, None
+
+
+@report_cards_bp.route('/report_cards', methods=['GET'])
+@jwt_required()
+def list_report_cards():
+    """Report cards of a whole grade level (?grade_level=) or class (?class_id=) for one term.
+
+    Weighted subject averages, subject positions and class ranks are computed
+    for the whole batch at once. ?format=xlsx returns a broadsheet with one
+    sheet per class instead of JSON.
+    """
+    term, academic_year, error = term_and_year()
+    if error:
+        return jsonify({"message": error}), 400
+    grade_level = request.args.get('grade_level')
+    class_id = request.args.get('class_id', type=int)
+    if not grade_level and class_id is None:
+        return jsonify({"message": "grade_level or class_id is required"}), 400
+
+    cards = compute_report_cards(term, academic_year, grade_level=grade_level, class_id=class_id)
+    if request.args.get('format') == 'xlsx':
+        if not cards:
+            return jsonify({"message": "No grades recorded for this term"}), 404
+        scope = grade_level or f"class_{class_id}"
+        return send_file(
+            broadsheet_workbook(cards),
+            as_attachment=True,
+            download_name=f"report_cards_{scope}_{academic_year}_{term.replace(' ', '_')}.xlsx",
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+    return jsonify(cards)
+
+
+@report_cards_bp.route('/report_cards/pdf', methods=['GET'])
+@jwt_required()
+def download_report_card_pdfs():
+    """ZIP of a term's PDF report cards for a grade level (?grade_level=) or class (?class_id=).
+
+    PDFs are rendered by the process's REPORT_CARD_WORKERS and streamed into
+    the archive as they finish. The archive ends with render_report.json,
+    giving the render time of each document and the batch's throughput. With
+    REPORT_CARD_CONCURRENT_BATCHES downloads rendering already, it is a 503.
+    """
+    term, academic_year, error = term_and_year()
+    if error:
+        return jsonify({"message": error}), 400
+    grade_level = request.args.get('grade_level')
+    class_id = request.args.get('class_id', type=int)
+    if not grade_level and class_id is None:
+        return jsonify({"message": "grade_level or class_id is required"}), 400
+
+    cards = prepare_report_cards(term, academic_year, grade_level=grade_level, class_id=class_id)
+    if not cards:
+        return jsonify({"message": "No grades recorded for this term"}), 404
+
+    release = claim_render_batch()
+    config = current_app.config
+    scope = grade_level or f"class_{class_id}"
+    response = Response(
+        stream_zip(cards, config['REPORT_CARD_WORKERS'], config['REPORT_CARD_CHUNK_SIZE'], current_app.logger),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="report_cards_{scope}_{academic_year}_{term.replace(" ", "_")}.zip"',
+        },
+    )
+    # Held until the archive is fully sent or the client goes away
+    response.call_on_close(release)
+    return response
+
+
+@report_cards_bp.route('/report_cards/students/<int:student_id>', methods=['GET'])
+@jwt_required()
+def get_student_report_card(student_id):
+    """One student's report card for a term, ranked within their class."""
+    term, academic_year, error = term_and_year()
+    if error:
+        return jsonify({"message": error}), 400
+    card = student_report_card(student_id, term, academic_year)
+    if card is None:
+        return jsonify({"message": "No report card for this student and term"}), 404
+    return jsonify(card)
@@ -1,5 +1,6 @@
+from datetime import datetime
 from flask import Blueprint
-from flask_restful import reqparse, fields, marshal_with, Resource, Api
+from flask_restful import reqparse, fields, marshal_with, Resource, Api, abort
 from models import db, Result
 
 result_bp = Blueprint('results', __name__)
@@ -23,6 +24,14 @@ result_fields = {
     'remarks': fields.String,
 }
 
+def parse_exam_date(value):
+    # Aborts rather than returns, so the error isn't run through marshal_with
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as e:
+        abort(400, error=f"Invalid date format: {str(e)}. Use YYYY-MM-DD format.")
+
+
 class ResultResource(Resource):
     @marshal_with(result_fields)
     def get(self, result_id):
@@ -39,11 +48,12 @@ class ResultResource(Resource):
         result = Result.query.get(result_id)
         if not result:
             return {"message": "Result not found"}, 404
+        exam_date = parse_exam_date(args['exam_date'])
         result.student_id = args['student_id']
         result.subject_id = args['subject_id']
         result.term = args['term']
         result.grade = args['grade']
-        result.exam_date = args['exam_date']
+        result.exam_date = exam_date
         result.remarks = args['remarks']
         db.session.commit()
         return result, 200
@@ -69,12 +79,13 @@ class ResultListResource(Resource):
     def post(self):
         """Create a new result"""
         args = result_parser.parse_args()
+        exam_date = parse_exam_date(args['exam_date'])
         new_result = Result(
             student_id=args['student_id'], 
             subject_id=args['subject_id'], 
             term=args['term'], 
             grade=args['grade'], 
-            exam_date=args['exam_date'], 
+            exam_date=exam_date, 
             remarks=args['remarks']
         )
         db.session.add(new_result)
@@ -1,6 +1,7 @@
 from flask import Blueprint
-from flask_restful import reqparse, fields, marshal_with, Resource, Api
+from flask_restful import reqparse, fields, marshal_with, marshal, Resource, Api
 from models import db, Role, Permission, RolePermission, UserRole
+from services.list_query import ListQuery
 
 role_bp = Blueprint('role', __name__)
 api = Api(role_bp)
@@ -35,17 +36,18 @@ permission_fields = {
     'description': fields.String,
 }
 
+role_list = ListQuery(Role, role_fields, sort_keys=('name',))
+
+
 class RoleResource(Resource):
-    @marshal_with(role_fields)
     def get(self, role_id=None):
         if role_id:
             role = Role.query.get(role_id)
             if role:
-                return role
+                return marshal(role, role_fields)
             return {'message': 'Role not found'}, 404
         else:
-            roles = Role.query.all()
-            return roles
+            return role_list.page(Role.query)
 
     def post(self):
         args = role_parser.parse_args()
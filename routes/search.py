@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify
+
+from services.people_search import get_people_index, KINDS
+from services.rbac import require_permission
+
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('/search', methods=['GET'])
+@require_permission("search_people")
+def search_people():
+    """Find students, parents, teachers and users by name, username, email or phone number.
+
+    ?q= is matched word by word against the start of indexed words, allowing
+    one typo in words of four letters or more. ?types= restricts the kinds of
+    people returned and ?limit= the number of results (default 20, max 100).
+    Results include email addresses and phone numbers, so it needs the
+    search_people permission.
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"message": "q query parameter is required"}), 400
+
+    kinds = KINDS
+    if request.args.get('types'):
+        kinds = tuple(kind.strip() for kind in request.args['types'].split(','))
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            return jsonify({"message": f"Unknown types: {', '.join(unknown)}, expected some of: {', '.join(KINDS)}"}), 400
+
+    limit = max(1, min(request.args.get('limit', type=int) or 20, 100))
+    return jsonify(get_people_index().search(query, kinds=kinds, limit=limit))
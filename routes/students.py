@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_restful import Resource, Api, reqparse, fields, marshal_with
 from datetime import datetime
 from models import db, Student, User, Classes
+from services.audit import audit
+from services.list_query import ListQuery
+from services.name_search import filter_student_names
+from services.rbac import require_permission
 
 # Define a Blueprint for students
 student_bp = Blueprint('students', __name__)
@@ -31,6 +35,7 @@ student_fields = {
 
 
 class StudentResource(Resource):
+    @require_permission("view_students")
     @marshal_with(student_fields)
     def get(self, student_id):
         """Get a specific student by ID"""
@@ -39,6 +44,7 @@ class StudentResource(Resource):
             return {"message": "Student not found"}, 404
         return student
 
+    @require_permission("update_students")
     @marshal_with(student_fields)
     def put(self, student_id):
         """Update a student's details"""
@@ -63,27 +69,42 @@ class StudentResource(Resource):
         student.grade_level = args['grade_level']
         student.class_id = args['class_id']
 
+        audit("UPDATE_STUDENT", f"Updated student {student.student_id} ({student.first_name} {student.last_name})")
         db.session.commit()
         return student, 200
 
+    @require_permission("delete_students")
     def delete(self, student_id):
         """Delete a student"""
         student = Student.query.get(student_id)
         if not student:
             return {"message": "Student not found"}, 404
 
+        audit("DELETE_STUDENT", f"Deleted student {student.student_id} ({student.first_name} {student.last_name})", sync=True)
         db.session.delete(student)
         db.session.commit()
         return {"message": "Student deleted successfully"}, 200
 
 
+student_list = ListQuery(
+    Student, student_fields,
+    sort_keys=('first_name', 'last_name', 'grade_level', 'class_id', 'enrollment_year'),
+)
+
+
 class StudentListResource(Resource):
-    @marshal_with(student_fields)
+    @require_permission("view_students")
     def get(self):
-        """Get all students"""
-        students = Student.query.all()
-        return students
+        """List students a page at a time, optionally searching by first_name, last_name or name"""
+        query = filter_student_names(
+            Student.query,
+            first_name=request.args.get('first_name'),
+            last_name=request.args.get('last_name'),
+            name=request.args.get('name'),
+        )
+        return student_list.page(query)
 
+    @require_permission("add_students")
     @marshal_with(student_fields)
     def post(self):
         """Create a new student"""
@@ -106,6 +127,7 @@ class StudentListResource(Resource):
             class_id=args['class_id']
         )
         db.session.add(new_student)
+        audit("CREATE_STUDENT", f"Created student {new_student.first_name} {new_student.last_name} in class {new_student.class_id}")
         db.session.commit()
         return new_student, 201
 
@@ -1,6 +1,7 @@
 from flask import Blueprint
 from flask_restful import reqparse, fields, marshal_with, Resource, Api
 from models import db, Subject
+from services.list_query import ListQuery
 
 subject_bp = Blueprint("subjects", __name__)
 api = Api(subject_bp)
@@ -49,12 +50,13 @@ class SubjectResource(Resource):
         return {"message": "Subject deleted"}, 200
 
 
+subject_list = ListQuery(Subject, subject_fields, sort_keys=('name', 'grade_level'))
+
+
 class SubjectListResource(Resource):
-    @marshal_with(subject_fields)
     def get(self):
-        """Get all subjects"""
-        subjects = Subject.query.all()
-        return subjects
+        """List subjects a page at a time"""
+        return subject_list.page(Subject.query)
 
     @marshal_with(subject_fields)
     def post(self):
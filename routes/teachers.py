@@ -2,6 +2,7 @@ from datetime import datetime
 from flask import Blueprint
 from flask_restful import reqparse, fields, marshal_with, Resource, Api
 from models import db, Teacher
+from services.list_query import ListQuery
 
 teacher_bp = Blueprint('teacher_api', __name__)
 api = Api(teacher_bp)
@@ -58,12 +59,13 @@ class TeacherResource(Resource):
         return {"message": "Teacher deleted"}, 200
 
 
+teacher_list = ListQuery(Teacher, teacher_fields, sort_keys=('first_name', 'last_name', 'user_id'))
+
+
 class TeacherListResource(Resource):
-    @marshal_with(teacher_fields)
     def get(self):
-        """Get all teachers"""
-        teachers = Teacher.query.all()
-        return teachers
+        """List teachers a page at a time"""
+        return teacher_list.page(Teacher.query)
 
     @marshal_with(teacher_fields)
     def post(self):
@@ -1,15 +1,22 @@
+import csv
 import io
-from flask import Blueprint, request, send_file
+import tempfile
+from flask import Blueprint, request, send_file, Response, stream_with_context, current_app
 from flask_restful import Resource, Api, reqparse
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
     jwt_required,
     get_jwt_identity,
+    get_jwt,
 )
-from werkzeug.security import check_password_hash
 from openpyxl import Workbook
+from sqlalchemy import or_
 from models import db, User, UserRole, RolePermission, Permission, Role, AuditLog
+from services.rbac import resolve_user_access, access_claims, require_permission, CACHE_NAME as RBAC_CACHE
+from services.user_provisioning import UserProvisioning
+from services.audit import audit
+from services.cache_versions import bump_version
 
 auth_bp = Blueprint("auth", __name__)
 api = Api(auth_bp)
@@ -24,6 +31,104 @@ user_parser.add_argument("first_name", type=str, required=False, help="First nam
 user_parser.add_argument("last_name", type=str, required=False, help="Last name of the user")
 
 
+export_headers = [
+    "User ID",
+    "Username",
+    "First Name",
+    "Last Name",
+    "Role",
+    "Email",
+    "Is Active",
+    "Created At",
+]
+export_columns = [
+    User.user_id,
+    User.username,
+    User.first_name,
+    User.last_name,
+    User.role,
+    User.email,
+    User.isActive,
+    User.created_at,
+]
+
+
+def filter_users(query):
+    """Apply the ?role=, ?isActive= and ?search= filters of GET /users."""
+    role = request.args.get("role")
+    if role:
+        query = query.filter(User.role == role)
+
+    is_active = request.args.get("isActive")
+    if is_active is not None:
+        query = query.filter(User.isActive == (is_active.lower() == "true"))
+
+    search = request.args.get("search")
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(or_(
+            User.username.ilike(pattern),
+            User.email.ilike(pattern),
+            User.first_name.ilike(pattern),
+            User.last_name.ilike(pattern),
+        ))
+    return query
+
+
+def export_row(user):
+    return [
+        user.user_id,
+        user.username,
+        user.first_name,
+        user.last_name,
+        user.role,
+        user.email,
+        user.isActive,
+        user.created_at.isoformat() if user.created_at else None,
+    ]
+
+
+def export_users_xlsx(rows):
+    """Write rows into a write-only workbook spooled on disk, then send it."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Users")
+    sheet.append(export_headers)
+    for user in rows:
+        sheet.append(export_row(user))
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+
+    return send_file(
+        output,
+        as_attachment=True,
+        download_name="users.xlsx",
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+def export_users_csv(rows, chunk_size=1000):
+    """Stream rows as CSV, one chunk of lines at a time."""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(export_headers)
+        for count, user in enumerate(rows, start=1):
+            writer.writerow(export_row(user))
+            if count % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=users.csv"},
+    )
+
+
 class UserLogin(Resource):
     def post(self):
         # Parse request data
@@ -33,32 +138,33 @@ class UserLogin(Resource):
         
         # Find user
         user = User.query.filter_by(username=data["username"]).first()
-        if not user or not check_password_hash(user.password_hash, data["password"]):
+        if not user or not user.check_password(data["password"]):
             return {"message": "Invalid username or password"}, 401
+        if db.session.is_modified(user):
+            # check_password upgraded an outdated hash
+            db.session.commit()
 
         # Check if user is active
         if not user.isActive:
             return {"message": "User account is inactive. Please contact the administrator."}, 403
 
         # Fetch user's roles and permissions
-        roles = UserRole.query.filter_by(user_id=user.user_id).all()
-        role_ids = [role.role_id for role in roles]
-        permissions = RolePermission.query.filter(RolePermission.role_id.in_(role_ids)).all()
-        permission_names = [Permission.query.get(perm.permission_id).name for perm in permissions]
+        role_names, permission_names = resolve_user_access(user.user_id)
 
-        # Generate JWT tokens
-        access_token = create_access_token(identity={
-            "user_id": user.user_id,
-            "username": user.username,
-            "roles": [Role.query.get(role_id).name for role_id in role_ids],
-            "permissions": permission_names
-        })
-        refresh_token = create_refresh_token(identity={"user_id": user.user_id})
+        # Generate JWT tokens, permissions travel as a compact bitset claim
+        access_token = create_access_token(
+            identity=str(user.user_id),
+            additional_claims=access_claims(user.user_id, user.username),
+        )
+        refresh_token = create_refresh_token(
+            identity=str(user.user_id),
+            additional_claims={"username": user.username},
+        )
         
         user_information = {
             "user_id": user.user_id,
             "username": user.username,
-            "roles": [Role.query.get(role_id).name for role_id in role_ids],
+            "roles": role_names,
             "permissions": permission_names,
             "email": user.email,
             "isActive": user.isActive,
@@ -79,52 +185,13 @@ class UserResource(Resource):
         export_to_excel = request.args.get("export", "false").lower() == "true"
 
         if export_to_excel:
-            # Export all users to Excel
-            users = User.query.all()
-
-            # Create an Excel workbook
-            workbook = Workbook()
-            sheet = workbook.active
-            sheet.title = "Users"
-
-            # Add headers
-            headers = [
-                "User ID",
-                "Username",
-                "First Name",
-                "Last Name",
-                "Role",
-                "Email",
-                "Is Active",
-                "Created At",
-            ]
-            sheet.append(headers)
-
-            # Add user data
-            for user in users:
-                sheet.append([
-                    user.user_id,
-                    user.username,
-                    user.first_name,
-                    user.last_name,
-                    user.role,
-                    user.email,
-                    user.isActive,
-                    user.created_at.isoformat(),
-                ])
-
-            # Save the workbook to a bytes buffer
-            output = io.BytesIO()
-            workbook.save(output)
-            output.seek(0)
-
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                as_attachment=True,
-                download_name="users.xlsx",
-                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+            # Export the (filtered) users as a file, streamed from a server-side cursor
+            rows = filter_users(
+                db.session.query(*export_columns).order_by(User.user_id)
+            ).yield_per(1000)
+            if request.args.get("format", "xlsx").lower() == "csv":
+                return export_users_csv(rows)
+            return export_users_xlsx(rows)
 
         # Regular GET logic for retrieving users
         if user_id:
@@ -141,7 +208,7 @@ class UserResource(Resource):
                 "isActive": user.isActive,
                 "created_at": user.created_at.isoformat(),
             }
-        users = User.query.all()
+        users = filter_users(User.query).all()
         return [
             {
                 "user_id": user.user_id,
@@ -176,15 +243,10 @@ class UserResource(Resource):
         )
         user.set_password(args["password"])
         db.session.add(user)
-        db.session.commit()
+        db.session.flush()
 
         # Log user creation action
-        log = AuditLog(
-            user_id=user.user_id,
-            action="CREATE",
-            description=f"Created user {user.username}",
-        )
-        db.session.add(log)
+        audit("CREATE", f"Created user {user.username}", user_id=user.user_id)
         db.session.commit()
 
         return {"message": "User created successfully", "user_id": user.user_id}, 201
@@ -220,15 +282,8 @@ class UserResource(Resource):
         if args["password"]:
             user.set_password(args["password"])
 
-        db.session.commit()
-
         # Log user update action
-        log = AuditLog(
-            user_id=user.user_id,
-            action="UPDATE",
-            description=f"Updated user {user.username}",
-        )
-        db.session.add(log)
+        audit("UPDATE", f"Updated user {user.username}", user_id=user.user_id)
         db.session.commit()
 
         return {"message": "User updated successfully"}
@@ -240,19 +295,14 @@ class UserResource(Resource):
             return {"message": "User not found"}, 404
 
         # Check if there are any existing audit logs for this user
-        existing_log = AuditLog.query.filter_by(user_id=user_id).first()
+        existing_log = db.session.query(AuditLog.query.filter_by(user_id=user_id).exists()).scalar()
         
         # If there's an existing audit log, don't delete the user
         if existing_log:
             return {"message": "User cannot be deleted because an audit log exists"}, 400
 
         # Log user deletion action before deleting the user if no audit log exists
-        log = AuditLog(
-            user_id=user.user_id,
-            action="DELETE",
-            description=f"Deleted user {user.username}",
-        )
-        db.session.add(log)
+        audit("DELETE", f"Deleted user {user.username}", user_id=user.user_id, sync=True)
 
         # Now delete the user
         db.session.delete(user)
@@ -293,16 +343,17 @@ class UserResource(Resource):
             for perm in valid_permissions:
                 role_permission = RolePermission(role_id=user_role.role_id, permission_id=perm.permission_id)
                 db.session.add(role_permission)
-        
-        db.session.commit()
-        
-        # Log permission update
-        log = AuditLog(
+
+        # The bulk delete above skips the session hooks, so invalidate the RBAC cache explicitly
+        bump_version(db.session, RBAC_CACHE)
+
+        # Log permission update, committed together with the change
+        audit(
+            "UPDATE_PERMISSIONS",
+            f"Updated permissions for user {user.username} to: {', '.join(map(str, valid_permission_ids))}",
             user_id=user.user_id,
-            action="UPDATE_PERMISSIONS",
-            description=f"Updated permissions for user {user.username} to: {', '.join(map(str, valid_permission_ids))}"
+            sync=True,
         )
-        db.session.add(log)
         db.session.commit()
         
         return {"message": "Permissions updated successfully", "permissions": valid_permission_ids}, 200
@@ -314,8 +365,11 @@ class TokenRefresh(Resource):
         # Get the identity of the user from the refresh token
         current_user = get_jwt_identity()
 
-        # Generate a new access token
-        new_access_token = create_access_token(identity=current_user)
+        # Generate a new access token with up to date roles and permissions
+        new_access_token = create_access_token(
+            identity=current_user,
+            additional_claims=access_claims(int(current_user), get_jwt().get("username")),
+        )
 
         return {
             "message": "Token refreshed successfully",
@@ -323,7 +377,20 @@ class TokenRefresh(Resource):
         }, 200
 
 
+class UserBulkResource(Resource):
+    @require_permission("add_users")
+    def post(self):
+        """Create many users, with their student/parent profiles, in one transaction."""
+        data = request.get_json(silent=True)
+        if not isinstance(data, list) or not data:
+            return {"message": "Expected a non-empty list of users"}, 400
+
+        provisioning = UserProvisioning(chunk_size=current_app.config['USER_PROVISIONING_CHUNK_SIZE'])
+        return provisioning.provision(data)
+
+
 # Add the refresh token endpoint to the API
 api.add_resource(TokenRefresh, "/refresh-token")
 api.add_resource(UserLogin, "/login")
 api.add_resource(UserResource, "/users", "/users/<int:user_id>")
+api.add_resource(UserBulkResource, "/users/bulk")
@@ -1,6 +1,11 @@
 from app import create_app
+from services.import_jobs import fail_interrupted_jobs
 
 app = create_app()
 
+# Imports run in-process, whatever was in flight died with the last server
+with app.app_context():
+    fail_interrupted_jobs()
+
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    app.run()
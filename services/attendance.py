@@ -0,0 +1,56 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from models import db, Attendance
+from services.attendance_rollups import refresh_student_months, refresh_class_days
+
+attendance_table = Attendance.__table__
+
+STATUSES = ('Present', 'Absent', 'Late')
+
+_upsert_inserts = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def record_roll_call(class_id, attendance_date, statuses):
+    """Record the status of every student in ``statuses`` for one class and day.
+
+    One multi-row INSERT .. ON CONFLICT (or ON DUPLICATE KEY) UPDATE keyed on
+    (student_id, class_id, attendance_date), so submitting a register twice
+    leaves the latest statuses. On other databases the matching rows are
+    deleted and inserted again. Runs in the caller's transaction, and
+    recounts the attendance rollups the Core statement bypasses the
+    session hooks for.
+    """
+    rows = [
+        {"student_id": student_id, "class_id": class_id, "attendance_date": attendance_date, "status": status}
+        for student_id, status in statuses.items()
+    ]
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in _upsert_inserts:
+        statement = _upsert_inserts[dialect](attendance_table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=['student_id', 'class_id', 'attendance_date'],
+            set_={'status': statement.excluded.status},
+        )
+    elif dialect in ('mysql', 'mariadb'):
+        statement = mysql.insert(attendance_table).values(rows)
+        statement = statement.on_duplicate_key_update(status=statement.inserted.status)
+    else:
+        db.session.execute(
+            attendance_table.delete().where(
+                attendance_table.c.class_id == class_id,
+                attendance_table.c.attendance_date == attendance_date,
+                attendance_table.c.student_id.in_(list(statuses)),
+            )
+        )
+        statement = attendance_table.insert().values(rows)
+
+    connection = db.session.connection()
+    connection.execute(statement)
+    refresh_student_months(connection, [(student_id, attendance_date) for student_id in statuses])
+    refresh_class_days(connection, [(class_id, attendance_date)])
@@ -0,0 +1,237 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+
+from models import db, Attendance, AttendanceArchive
+from services.grading import academic_year_for, academic_year_bounds
+
+attendance_table = Attendance.__table__
+
+# Two-bit code of each status, 0 being a day without a record
+CODES = {'Present': 1, 'Absent': 2, 'Late': 3}
+STATUS_NAMES = {code: status for status, code in CODES.items()}
+
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def pack(codes):
+    """Pack an array of two-bit codes four days to a byte, the first day in the low bits."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    return np.bitwise_or.reduce(padded.reshape(-1, 4) << _SHIFTS, axis=1).astype(np.uint8).tobytes()
+
+
+def unpack(blob, days=None):
+    """The codes packed by ``pack``, as a writable uint8 array of ``days`` entries."""
+    packed = np.frombuffer(blob, dtype=np.uint8)
+    codes = ((packed[:, None] >> _SHIFTS) & 3).reshape(-1)
+    return codes[:days] if days is not None else codes
+
+
+class AttendanceHistory:
+    """Daily status codes of a student, day ``i`` being ``first_day + i``."""
+
+    def __init__(self, first_day, codes):
+        self.first_day = first_day
+        self.codes = codes
+
+    def _window(self, start=None, end=None):
+        """Codes from ``start`` up to ``end`` (both included) and the day of the first one."""
+        first = 0 if start is None else max((start - self.first_day).days, 0)
+        last = len(self.codes) if end is None else max((end - self.first_day).days + 1, first)
+        return self.codes[first:last], self.first_day + timedelta(days=first)
+
+    def counts(self, start=None, end=None):
+        codes, _ = self._window(start, end)
+        tally = np.bincount(codes, minlength=4)
+        counts = {status.lower(): int(tally[code]) for status, code in CODES.items()}
+        counts['total'] = int(tally[1:].sum())
+        return counts
+
+    def streaks(self, status, min_length=2, start=None, end=None):
+        """Runs of at least ``min_length`` consecutive recorded days with ``status``.
+
+        Days without a record, weekends and holidays, neither break nor extend a run.
+        """
+        codes, first_day = self._window(start, end)
+        recorded = np.flatnonzero(codes)
+        hits = (codes[recorded] == CODES[status]).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], hits, [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        keep = (ends - starts) >= min_length
+        return [
+            {
+                "from": (first_day + timedelta(days=int(recorded[s]))).isoformat(),
+                "to": (first_day + timedelta(days=int(recorded[e - 1]))).isoformat(),
+                "days": int(e - s),
+            }
+            for s, e in zip(starts[keep], ends[keep])
+        ]
+
+
+def archived_until():
+    """First day still kept as Attendance rows, or None if nothing was archived."""
+    return db.session.query(db.func.max(AttendanceArchive.archived_until)).scalar()
+
+
+def is_archived(day):
+    boundary = archived_until()
+    return boundary is not None and day < boundary
+
+
+def archive_cutoff(today):
+    """First day of the month holding the start of ``today``'s week.
+
+    Archiving whole months keeps every attendance rollup row either fully
+    archived or fully in Attendance, and the current week always in Attendance.
+    """
+    week_start = today - timedelta(days=today.weekday())
+    return date(week_start.year, week_start.month, 1)
+
+
+def load_history(student_id, academic_year):
+    """Attendance of a student over an academic year, from its archives and the Attendance rows."""
+    first_day, end = academic_year_bounds(academic_year)
+    codes = np.zeros((end - first_day).days, dtype=np.uint8)
+
+    for archive in AttendanceArchive.query.filter_by(student_id=student_id, academic_year=academic_year):
+        offset = (archive.first_day - first_day).days
+        archived = unpack(archive.statuses)[:max(len(codes) - offset, 0)]
+        days = np.flatnonzero(archived)
+        codes[days + offset] = archived[days]
+
+    rows = db.session.execute(
+        db.select(Attendance.attendance_date, Attendance.status)
+        .where(
+            Attendance.student_id == student_id,
+            Attendance.attendance_date >= first_day,
+            Attendance.attendance_date < end,
+        )
+    ).all()
+    if rows:
+        days = np.array([(day - first_day).days for day, _ in rows])
+        codes[days] = [CODES[status] for _, status in rows]
+    return AttendanceHistory(first_day, codes)
+
+
+def _archive_batch(student_ids, before):
+    rows = db.session.execute(
+        db.select(Attendance.student_id, Attendance.class_id, Attendance.attendance_date, Attendance.status)
+        .where(Attendance.student_id.in_(student_ids), Attendance.attendance_date < before)
+    ).all()
+
+    by_archive = defaultdict(list)
+    for student_id, class_id, attendance_date, status in rows:
+        by_archive[(student_id, class_id, academic_year_for(attendance_date))].append((attendance_date, status))
+
+    archives = {
+        (archive.student_id, archive.class_id, archive.academic_year): archive
+        for archive in AttendanceArchive.query.filter(AttendanceArchive.student_id.in_(student_ids))
+    }
+    for key, days in by_archive.items():
+        archive = archives.get(key)
+        first_day, end = academic_year_bounds(key[2])
+        if archive is None:
+            archive = AttendanceArchive(
+                student_id=key[0], class_id=key[1], academic_year=key[2],
+                first_day=first_day, archived_until=before,
+            )
+            codes = np.zeros((end - first_day).days, dtype=np.uint8)
+            db.session.add(archive)
+            archives[key] = archive
+        else:
+            codes = unpack(archive.statuses, (end - archive.first_day).days)
+        codes[[(day - archive.first_day).days for day, _ in days]] = [CODES[status] for _, status in days]
+        archive.statuses = pack(codes)
+
+    for archive in archives.values():
+        if archive.archived_until is None or archive.archived_until < before:
+            archive.archived_until = before
+
+    # Core delete, the rollups already count these days and must keep doing so
+    db.session.execute(attendance_table.delete().where(
+        attendance_table.c.student_id.in_(student_ids),
+        attendance_table.c.attendance_date < before,
+    ))
+    db.session.commit()
+    return len(rows)
+
+
+def archive_attendance(before, batch_size=500):
+    """Move the Attendance rows of days before the month of ``before`` into the archives.
+
+    Works through ``batch_size`` students at a time, one commit each, and
+    returns the number of rows moved.
+    """
+    before = date(before.year, before.month, 1)
+    moved = 0
+    while True:
+        student_ids = db.session.execute(
+            db.select(Attendance.student_id)
+            .where(Attendance.attendance_date < before)
+            .distinct()
+            .order_by(Attendance.student_id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not student_ids:
+            return moved
+        moved += _archive_batch(student_ids, before)
+
+
+def archived_rollups():
+    """Rollup rows (student months, class days) counting the archived days."""
+    month_counts = defaultdict(lambda: np.zeros(4, dtype=np.int64))
+    day_counts = {}
+
+    for archive in AttendanceArchive.query.yield_per(500):
+        codes = unpack(archive.statuses)
+        recorded = np.flatnonzero(codes)
+        if not len(recorded):
+            continue
+        recorded_codes = codes[recorded]
+
+        months = (np.datetime64(archive.first_day, 'D') + recorded).astype('datetime64[M]').astype(np.int64)
+        keys, tallies = np.unique(months * 4 + recorded_codes, return_counts=True)
+        for key, tally in zip(keys, tallies):
+            month, code = divmod(int(key), 4)
+            month_counts[(archive.student_id, 1970 + month // 12, month % 12 + 1)][code] += tally
+
+        days = day_counts.setdefault((archive.class_id, archive.first_day), np.zeros((len(codes), 4), dtype=np.int64))
+        if len(days) < len(codes):
+            days = np.vstack([days, np.zeros((len(codes) - len(days), 4), dtype=np.int64)])
+            day_counts[(archive.class_id, archive.first_day)] = days
+        np.add.at(days, (recorded, recorded_codes), 1)
+
+    def counts(tally):
+        return {
+            "present": int(tally[1]), "absent": int(tally[2]), "late": int(tally[3]),
+            "total": int(tally[1:].sum()),
+        }
+
+    student_months = [
+        dict(student_id=student_id, year=year, month=month, **counts(tally))
+        for (student_id, year, month), tally in month_counts.items()
+    ]
+    class_days = [
+        dict(class_id=class_id, attendance_date=first_day + timedelta(days=int(day)), **counts(days[day]))
+        for (class_id, first_day), days in day_counts.items()
+        for day in np.flatnonzero(days[:, 1:].sum(axis=1))
+    ]
+    return student_months, class_days
+
+
+@click.command('archive-attendance')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Archive whole months before this day (default: the month holding the start of this week)')
+@click.option('--batch-size', type=int, default=500, help='Students archived per commit')
+@with_appcontext
+def archive_attendance_command(before, batch_size):
+    """Pack old attendance rows into per-student, per-year bitmap archives."""
+    before = before.date() if before else archive_cutoff(date.today())
+    moved = archive_attendance(before, batch_size)
+    click.echo(f"Archived {moved} attendance records before {date(before.year, before.month, 1)}")
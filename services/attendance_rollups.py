@@ -0,0 +1,280 @@
+from collections import defaultdict
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, Attendance, AttendanceStudentMonth, AttendanceClassDay, Student
+from services.attendance_archive import archived_rollups
+from services.batching import chunks, history_values
+
+student_months = AttendanceStudentMonth.__table__
+class_days = AttendanceClassDay.__table__
+
+# Rollup column counting each attendance status
+COUNTED_STATUSES = (('present', 'Present'), ('absent', 'Absent'), ('late', 'Late'))
+
+COUNT_COLUMNS = [column for column, _ in COUNTED_STATUSES] + ['total']
+
+_upsert_inserts = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def _counts():
+    return [
+        db.func.sum(db.case((Attendance.status == status, 1), else_=0))
+        for _, status in COUNTED_STATUSES
+    ] + [db.func.count()]
+
+
+def _student_month_source():
+    year = db.extract('year', Attendance.attendance_date)
+    month = db.extract('month', Attendance.attendance_date)
+    return (
+        db.select(Attendance.student_id, year, month, *_counts())
+        .group_by(Attendance.student_id, year, month)
+    )
+
+
+def _class_day_source():
+    return (
+        db.select(Attendance.class_id, Attendance.attendance_date, *_counts())
+        .group_by(Attendance.class_id, Attendance.attendance_date)
+    )
+
+
+def _month_bounds(year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def _by_date(keys):
+    """Group (id, attendance_date) pairs by date, skipping incomplete ones."""
+    grouped = defaultdict(set)
+    for key, attendance_date in keys:
+        if key is not None and isinstance(attendance_date, date):
+            grouped[attendance_date].add(key)
+    return grouped
+
+
+def _upsert_counts(connection, table, key_columns, source, existing):
+    """Write the counts ``source`` selects into ``table``, replacing the rows with the same key.
+
+    An INSERT .. ON CONFLICT (or ON DUPLICATE KEY) UPDATE where the database
+    has one, so two transactions recounting the same key can't both insert
+    it. On other databases the ``existing`` rows are deleted first.
+    """
+    columns = key_columns + COUNT_COLUMNS
+    dialect = connection.dialect.name
+    if dialect in _upsert_inserts:
+        statement = _upsert_inserts[dialect](table).from_select(columns, source)
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: statement.excluded[column] for column in COUNT_COLUMNS},
+        )
+    elif dialect in ('mysql', 'mariadb'):
+        statement = mysql.insert(table).from_select(columns, source)
+        statement = statement.on_duplicate_key_update({column: statement.inserted[column] for column in COUNT_COLUMNS})
+    else:
+        connection.execute(table.delete().where(*existing))
+        statement = table.insert().from_select(columns, source)
+    connection.execute(statement)
+
+
+def refresh_student_months(connection, keys):
+    """Recount the student months holding an iterable of (student_id, attendance_date) pairs."""
+    by_month = defaultdict(set)
+    for attendance_date, student_ids in _by_date(keys).items():
+        by_month[(attendance_date.year, attendance_date.month)].update(student_ids)
+
+    for (year, month), student_ids in by_month.items():
+        start, end = _month_bounds(year, month)
+        for chunk in chunks(student_ids):
+            existing = (
+                student_months.c.year == year,
+                student_months.c.month == month,
+                student_months.c.student_id.in_(chunk),
+            )
+            _upsert_counts(connection, student_months, ['student_id', 'year', 'month'], _student_month_source().where(
+                Attendance.attendance_date >= start,
+                Attendance.attendance_date < end,
+                Attendance.student_id.in_(chunk),
+            ), existing)
+            # Months whose last record was deleted or moved away
+            connection.execute(student_months.delete().where(*existing, ~db.exists().where(
+                Attendance.student_id == student_months.c.student_id,
+                Attendance.attendance_date >= start,
+                Attendance.attendance_date < end,
+            )))
+
+
+def refresh_class_days(connection, keys):
+    """Recount the class days of an iterable of (class_id, attendance_date) pairs."""
+    for attendance_date, class_ids in _by_date(keys).items():
+        for chunk in chunks(class_ids):
+            existing = (
+                class_days.c.attendance_date == attendance_date,
+                class_days.c.class_id.in_(chunk),
+            )
+            _upsert_counts(connection, class_days, ['class_id', 'attendance_date'], _class_day_source().where(
+                Attendance.attendance_date == attendance_date,
+                Attendance.class_id.in_(chunk),
+            ), existing)
+            connection.execute(class_days.delete().where(*existing, ~db.exists().where(
+                Attendance.class_id == class_days.c.class_id,
+                Attendance.attendance_date == attendance_date,
+            )))
+
+
+def rebuild_rollups(connection):
+    """Recount both rollup tables from scratch, archived attendance included.
+
+    Archives hold whole months, so their rows never overlap those counted
+    from Attendance.
+    """
+    connection.execute(student_months.delete())
+    connection.execute(student_months.insert().from_select(
+        ['student_id', 'year', 'month'] + COUNT_COLUMNS, _student_month_source(),
+    ))
+    connection.execute(class_days.delete())
+    connection.execute(class_days.insert().from_select(
+        ['class_id', 'attendance_date'] + COUNT_COLUMNS, _class_day_source(),
+    ))
+
+    archived_months, archived_days = archived_rollups()
+    for chunk in chunks(archived_months):
+        connection.execute(student_months.insert(), chunk)
+    for chunk in chunks(archived_days):
+        connection.execute(class_days.insert(), chunk)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_attendance_changes(session, flush_context, instances):
+    pending = session.info.setdefault('attendance_rollups', {'students': set(), 'classes': set()})
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Attendance):
+            pending['students'].update(history_values(obj, 'student_id', 'attendance_date'))
+            pending['classes'].update(history_values(obj, 'class_id', 'attendance_date'))
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_attendance_changes(session, flush_context):
+    pending = session.info.pop('attendance_rollups', None)
+    if not pending:
+        return
+
+    connection = session.connection()
+    if pending['students']:
+        refresh_student_months(connection, pending['students'])
+    if pending['classes']:
+        refresh_class_days(connection, pending['classes'])
+
+
+def _summary(row):
+    """Counts of a rollup row, with the attended (present or late) and absence rates in percent."""
+    present, absent, late, total = (row.present or 0), (row.absent or 0), (row.late or 0), (row.total or 0)
+    return {
+        "present": present,
+        "absent": absent,
+        "late": late,
+        "total": total,
+        "attendance_rate": round(100.0 * (present + late) / total, 2) if total else None,
+        "absence_rate": round(100.0 * absent / total, 2) if total else None,
+    }
+
+
+def _sums(table):
+    return [db.func.sum(table.c[column]).label(column) for column in COUNT_COLUMNS]
+
+
+def _month_number(table):
+    return table.c.year * 12 + table.c.month
+
+
+def _student_month_query(start_month=None, end_month=None, class_id=None, student_id=None):
+    """Per-student sums of the month rollups between two (year, month) pairs, both included."""
+    query = (
+        db.select(student_months.c.student_id, *_sums(student_months))
+        .group_by(student_months.c.student_id)
+    )
+    if start_month:
+        query = query.where(_month_number(student_months) >= start_month[0] * 12 + start_month[1])
+    if end_month:
+        query = query.where(_month_number(student_months) <= end_month[0] * 12 + end_month[1])
+    if student_id is not None:
+        query = query.where(student_months.c.student_id == student_id)
+    if class_id is not None:
+        query = query.where(student_months.c.student_id.in_(
+            db.select(Student.student_id).where(Student.class_id == class_id)
+        ))
+    return query
+
+
+def student_attendance_rates(start_month=None, end_month=None, class_id=None, student_id=None):
+    """Attendance counts and rates of every student, optionally within a class, over a month range."""
+    rows = db.session.execute(
+        _student_month_query(start_month, end_month, class_id, student_id)
+        .order_by(student_months.c.student_id)
+    )
+    return [dict(student_id=row.student_id, **_summary(row)) for row in rows]
+
+
+def chronic_absentees(threshold, start_month=None, end_month=None, class_id=None, min_days=1):
+    """Students absent on at least ``threshold`` percent of their recorded days, most absent first."""
+    totals = _student_month_query(start_month, end_month, class_id).subquery()
+    rows = db.session.execute(
+        db.select(totals)
+        .where(
+            totals.c.total >= min_days,
+            totals.c.absent * 100.0 >= totals.c.total * threshold,
+        )
+        .order_by((totals.c.absent * 1.0 / totals.c.total).desc(), totals.c.student_id)
+    )
+    return [dict(student_id=row.student_id, **_summary(row)) for row in rows]
+
+
+def class_attendance_trend(start_date=None, end_date=None, class_id=None, period='day'):
+    """Daily or monthly attendance counts and rates of one class, or of every class together."""
+    if period == 'month':
+        year = db.extract('year', class_days.c.attendance_date)
+        month = db.extract('month', class_days.c.attendance_date)
+        keys = [year.label('year'), month.label('month')]
+        group = [year, month]
+    else:
+        keys = [class_days.c.attendance_date]
+        group = [class_days.c.attendance_date]
+
+    query = db.select(*keys, *_sums(class_days)).group_by(*group).order_by(*group)
+    if start_date:
+        query = query.where(class_days.c.attendance_date >= start_date)
+    if end_date:
+        query = query.where(class_days.c.attendance_date <= end_date)
+    if class_id is not None:
+        query = query.where(class_days.c.class_id == class_id)
+
+    trend = []
+    for row in db.session.execute(query):
+        if period == 'month':
+            label = f"{int(row.year):04d}-{int(row.month):02d}"
+        else:
+            label = row.attendance_date.isoformat()
+        trend.append(dict(period=label, **_summary(row)))
+    return trend
+
+
+@click.command('rebuild-attendance-rollups')
+@with_appcontext
+def rebuild_attendance_rollups_command():
+    """Rebuild the attendance rollup tables from attendance records."""
+    rebuild_rollups(db.session.connection())
+    db.session.commit()
+    months = db.session.query(db.func.count()).select_from(AttendanceStudentMonth).scalar()
+    days = db.session.query(db.func.count()).select_from(AttendanceClassDay).scalar()
+    click.echo(f"Rebuilt attendance rollups with {months} student months and {days} class days")
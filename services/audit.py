@@ -0,0 +1,188 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, AuditLog
+
+audit_logs_table = AuditLog.__table__
+
+
+def current_user_id():
+    """Id of the user of the request's access token, if it carries one."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return None
+    return int(identity) if identity is not None else None
+
+
+class AuditWriter:
+    """Writes queued audit events to audit_logs in batches from a daemon thread.
+
+    The queue holds at most ``queue_size`` events. When it is full the event
+    is written by the caller instead, so nothing is dropped under load.
+    A batch that fails is retried one event at a time, and events that still
+    fail are retried with the next flush, up to ``max_attempts`` writes, so a
+    bad row or a short outage doesn't lose the whole batch. Whatever is still
+    queued is written when the process exits.
+    """
+
+    max_attempts = 3
+
+    def __init__(self, app, batch_size, flush_interval, queue_size):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # (event, failed attempts) pairs
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._retry = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def put(self, events):
+        for entry in events:
+            try:
+                self.queue.put_nowait((entry, 0))
+            except queue.Full:
+                # Runs in an after_commit hook, the change is committed already
+                try:
+                    self.write([entry])
+                except Exception:
+                    self.app.logger.exception("Could not write audit event %r", entry)
+
+    def write(self, events):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(audit_logs_table.insert(), events)
+
+    def _drain(self):
+        items = []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                items = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                if self._retry:
+                    self.flush()
+                continue
+            # Give the batch up to flush_interval to fill before writing it
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size and not self._stopped.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.flush(items)
+
+    def flush(self, items=()):
+        """Write ``items``, the events due a retry and everything queued so far, a batch at a time."""
+        items = self._retry + list(items)
+        self._retry = []
+        while True:
+            items += self._drain()
+            if not items:
+                return
+            self._write_batch(items)
+            items = []
+
+    def _write_batch(self, items):
+        try:
+            self.write([entry for entry, _ in items])
+            return
+        except Exception:
+            self.app.logger.warning("Could not write %d audit events at once, retrying them one by one", len(items), exc_info=True)
+
+        for entry, attempts in items:
+            try:
+                self.write([entry])
+            except Exception:
+                if attempts + 1 < self.max_attempts:
+                    self._retry.append((entry, attempts + 1))
+                else:
+                    self.app.logger.exception("Dropped audit event %r after %d attempts", entry, attempts + 1)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+        if self._retry:
+            # Last chance for events that failed the exit flush
+            self.flush()
+        for entry, _ in self._retry:
+            self.app.logger.error("Dropped audit event %r at exit", entry)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Audit writer of this process, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = current_app.config
+            _writer = AuditWriter(
+                current_app._get_current_object(),
+                batch_size=config['AUDIT_BATCH_SIZE'],
+                flush_interval=config['AUDIT_FLUSH_INTERVAL'],
+                queue_size=config['AUDIT_QUEUE_SIZE'],
+            )
+        return _writer
+
+
+def audit_entry(action, description, user_id=None):
+    """An audit_logs row for an event happening now, by ``user_id`` or the request's user."""
+    return {
+        "user_id": user_id if user_id is not None else current_user_id(),
+        "action": action,
+        "description": description,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def audit(action, description, user_id=None, sync=False):
+    """Record an audit event for the change pending in ``db.session``.
+
+    Call it before committing the change. With ``sync`` (or AUDIT_ASYNC off)
+    the row is part of the same transaction, so the change and its audit row
+    are committed together. Otherwise the event is queued once the session
+    commits and written in a later batch, and dropped if it rolls back.
+    """
+    entry = audit_entry(action, description, user_id)
+    if sync or not current_app.config['AUDIT_ASYNC']:
+        db.session.add(AuditLog(**entry))
+    else:
+        db.session.info.setdefault('pending_audit', []).append(entry)
+
+
+@event.listens_for(Session, 'after_commit')
+def _queue_audit_events(session):
+    events = session.info.pop('pending_audit', None)
+    if events:
+        get_writer().put(events)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_audit_events(session):
+    session.info.pop('pending_audit', None)
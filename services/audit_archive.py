@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, AuditLog
+
+audit_logs_table = AuditLog.__table__
+
+
+def _month_start(day):
+    return datetime(day.year, day.month, 1)
+
+
+def _next_month(month):
+    return datetime(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def archive_table(month):
+    """audit_logs_archive_YYYY_MM, a copy of audit_logs without its foreign key and indexes."""
+    name = f"audit_logs_archive_{month:%Y_%m}"
+    metadata = db.MetaData()
+    table = db.Table(
+        name, metadata,
+        db.Column('log_id', db.Integer, primary_key=True),
+        db.Column('user_id', db.Integer),
+        db.Column('action', db.String(255), nullable=False),
+        db.Column('description', db.Text),
+        db.Column('created_at', db.DateTime),
+    )
+    metadata.create_all(db.engine, checkfirst=True)
+    return table
+
+
+def archive_file(month):
+    folder = current_app.config['AUDIT_ARCHIVE_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"audit_logs_{month:%Y_%m}.jsonl.gz")
+
+
+def _move_batch(rows, target, month):
+    columns = audit_logs_table.c
+    log_ids = [row.log_id for row in rows]
+    if target == 'table':
+        table = archive_table(month)
+        db.session.execute(
+            table.insert().from_select(
+                [c.name for c in table.c],
+                db.select(columns.log_id, columns.user_id, columns.action, columns.description, columns.created_at)
+                .where(columns.log_id.in_(log_ids))
+            )
+        )
+    else:
+        # gzip members can be appended, the file stays one readable stream
+        with gzip.open(archive_file(month), 'at', encoding='utf-8') as out:
+            for row in rows:
+                out.write(json.dumps({
+                    "log_id": row.log_id,
+                    "user_id": row.user_id,
+                    "action": row.action,
+                    "description": row.description,
+                    "created_at": row.created_at.isoformat() if row.created_at else None,
+                }) + "\n")
+    db.session.execute(audit_logs_table.delete().where(columns.log_id.in_(log_ids)))
+    db.session.commit()
+
+
+def archive_audit_logs(before, target='table', batch_size=1000):
+    """Move audit log entries created before ``before`` out of audit_logs.
+
+    Entries go to one archive table (``target='table'``) or gzipped JSON
+    lines file (``target='file'``) per calendar month, ``batch_size`` rows
+    per transaction. Returns the number of entries moved per month.
+    """
+    columns = audit_logs_table.c
+    moved = {}
+    oldest = db.session.execute(
+        db.select(db.func.min(columns.created_at)).where(columns.created_at < before)
+    ).scalar()
+    month = _month_start(oldest) if oldest else None
+
+    while month is not None and month < before:
+        end = min(_next_month(month), before)
+        while True:
+            rows = db.session.execute(
+                db.select(columns.log_id, columns.user_id, columns.action, columns.description, columns.created_at)
+                .where(columns.created_at >= month, columns.created_at < end)
+                .order_by(columns.created_at, columns.log_id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            _move_batch(rows, target, month)
+            moved[f"{month:%Y-%m}"] = moved.get(f"{month:%Y-%m}", 0) + len(rows)
+        month = _next_month(month)
+    return moved
+
+
+@click.command('archive-audit-logs')
+@click.option('--days', type=int, default=None, help='Keep this many days in audit_logs (default AUDIT_RETENTION_DAYS)')
+@click.option('--to', 'target', type=click.Choice(['table', 'file']), default='table',
+              help='Monthly archive tables or gzipped JSON lines files in AUDIT_ARCHIVE_FOLDER')
+@click.option('--batch-size', type=int, default=1000)
+@with_appcontext
+def archive_audit_logs_command(days, target, batch_size):
+    """Move old audit log entries to monthly archives."""
+    days = days if days is not None else current_app.config['AUDIT_RETENTION_DAYS']
+    before = datetime.utcnow() - timedelta(days=days)
+    moved = archive_audit_logs(before, target, batch_size)
+    for month, count in moved.items():
+        click.echo(f"{month}: archived {count} entries")
+    click.echo(f"Archived {sum(moved.values())} audit log entries created before {before:%Y-%m-%d}")
@@ -0,0 +1,22 @@
+from sqlalchemy import inspect
+
+# Keep IN lists well below the bound parameter limit of SQLite
+CHUNK_SIZE = 500
+
+
+def chunks(values, size=CHUNK_SIZE):
+    """Lists of at most ``size`` of ``values``, in order."""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def history_values(obj, *keys):
+    """Current and previously persisted values of ``keys`` on ``obj``."""
+    state = inspect(obj)
+    current = tuple(getattr(obj, key) for key in keys)
+    previous = []
+    for key in keys:
+        history = state.attrs[key].history
+        previous.append(history.deleted[0] if history.deleted else getattr(obj, key))
+    return {current, tuple(previous)}
@@ -0,0 +1,124 @@
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from services.audit import audit
+from services.spreadsheets import UnreadableFile
+
+
+class BulkImport:
+    """Base class for chunked imports of row dicts.
+
+    Rows are validated and written one chunk at a time with a single
+    executemany insert, and each chunk is committed on its own so memory and
+    transaction size stay bounded. A bad row is reported in ``errors`` without
+    aborting the rest of the import.
+
+    Subclasses set ``table``, ``label``, ``error_key`` and ``audit_action``
+    and implement ``validate`` and ``entry``.
+    """
+
+    table = None
+    label = "entries"
+    error_key = None
+    audit_action = "IMPORT"
+
+    def __init__(self, chunk_size=1000, on_progress=None):
+        self.chunk_size = max(1, int(chunk_size))
+        self.on_progress = on_progress
+        self.imported_entries = []
+        self.errors = []
+        self.processed = 0
+
+    def run(self, items):
+        """Import an iterable of row dicts, chunk by chunk.
+
+        If the file behind ``items`` can't be read past some row, the rows
+        before it are still imported and the failure is reported in ``errors``.
+        """
+        chunk = []
+        try:
+            for item in items:
+                chunk.append((self.processed, item))
+                self.processed += 1
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk)
+                    chunk = []
+        except UnreadableFile as e:
+            self.error(self.processed, None, f"Could not read the rest of the file: {e}")
+        if chunk:
+            self._import_chunk(chunk)
+        return self
+
+    def _import_chunk(self, chunk):
+        self._write_chunk(chunk)
+        if self.on_progress:
+            self.on_progress(self)
+
+    def validate(self, idx, item):
+        """Return the row to insert for ``item``, or None after recording an error."""
+        raise NotImplementedError
+
+    def validate_chunk(self, chunk):
+        """Validate a list of (index, item) pairs, returning (index, row) pairs."""
+        rows = []
+        for idx, item in chunk:
+            row = self.validate(idx, item)
+            if row is not None:
+                rows.append((idx, row))
+        return rows
+
+    def filter_chunk(self, rows):
+        """Drop rows that must not be inserted, e.g. duplicates."""
+        return rows
+
+    def after_insert(self, rows):
+        """Called in the same transaction once ``rows`` have been inserted."""
+
+    def entry(self, row):
+        """Summary of an imported row for the response."""
+        raise NotImplementedError
+
+    def error(self, idx, value, message):
+        self.errors.append({
+            "index": idx,
+            self.error_key: value,
+            "error": message
+        })
+
+    def _write_chunk(self, chunk):
+        accepted = self.filter_chunk(self.validate_chunk(chunk))
+        if not accepted:
+            return
+
+        try:
+            with db.session.begin_nested():
+                self._insert([row for _, row in accepted])
+        except IntegrityError:
+            # Something in the chunk was rejected, find out which rows by retrying one at a time
+            inserted = []
+            for idx, row in accepted:
+                try:
+                    with db.session.begin_nested():
+                        self._insert([row])
+                    inserted.append((idx, row))
+                except IntegrityError as e:
+                    self.error(idx, row.get(self.error_key), str(e.orig))
+            accepted = inserted
+
+        if accepted:
+            audit(self.audit_action, f"Imported {len(accepted)} {self.label}")
+        db.session.commit()
+        self.imported_entries.extend(self.entry(row) for _, row in accepted)
+
+    def _insert(self, rows):
+        db.session.execute(self.table.insert(), rows)
+        self.after_insert(rows)
+
+    def response(self):
+        response = {
+            "message": f"{len(self.imported_entries)} {self.label} imported successfully",
+            "imported_entries": self.imported_entries,
+        }
+        if self.errors:
+            response["errors"] = self.errors
+        return response, 201 if self.imported_entries else 400
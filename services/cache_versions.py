@@ -0,0 +1,127 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, CacheVersion
+
+cache_versions_table = CacheVersion.__table__
+
+# Cache name -> model classes whose changes invalidate it
+_watched = {}
+
+# Cache name -> VersionedCache instances of this process
+_caches = {}
+
+
+def current_version(name):
+    """Version of the named cache, one primary key lookup."""
+    return db.session.execute(
+        db.select(CacheVersion.version).where(CacheVersion.name == name)
+    ).scalar() or 0
+
+
+def bump_version(session, name, changes=None):
+    """Increment the named cache version in the session's transaction.
+
+    Readers in other processes only see the new version once the change it
+    describes is committed. Caches of this process are dropped on commit, or
+    updated if every bump of the transaction names its ``changes``
+    and the cache has an updater.
+    """
+    connection = session.connection()
+    result = connection.execute(
+        cache_versions_table.update()
+        .where(cache_versions_table.c.name == name)
+        .values(version=cache_versions_table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(cache_versions_table.insert().values(name=name, version=1))
+    bumped = session.info.setdefault('bumped_caches', {})
+    count, pending = bumped.get(name, (0, set()))
+    bumped[name] = (count + 1, None if changes is None or pending is None else pending | set(changes))
+
+
+def watch_models(name, *models):
+    """Bump the ``name`` cache version whenever an instance of ``models`` is flushed."""
+    _watched[name] = tuple(models)
+
+
+class VersionedCache:
+    """Process-local cache of ``loader()``, reloaded when its version changes.
+
+    The version row is read at most once every ``check_interval`` seconds (a
+    number, or a callable returning one), so with a non-zero interval a change
+    made by another process shows up after at most that long. Changes committed
+    by this process drop the cache at once, unless it has an ``updater``.
+
+    ``updater(value, changes)`` returns the cached value with the changes
+    named by this process's bumps applied. It is only used while the version
+    has moved by exactly those bumps, anything else reloads the whole value.
+    """
+
+    def __init__(self, name, loader, check_interval=0, updater=None):
+        self.name = name
+        self.loader = loader
+        self.check_interval = check_interval
+        self.updater = updater
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._next_check = 0
+        self._own_bumps = 0
+        self._changes = set()
+        _caches.setdefault(name, []).append(self)
+
+    def get(self, fresh=False):
+        """The cached value, checked against the version row first if ``fresh``."""
+        with self._lock:
+            now = time.monotonic()
+            if fresh or self._value is None or self._own_bumps or now >= self._next_check:
+                version = current_version(self.name)
+                if self._value is not None and self._own_bumps and version == self._version + self._own_bumps:
+                    self._value = self.updater(self._value, self._changes)
+                elif self._value is None or version != self._version:
+                    self._value = self.loader()
+                self._version = version
+                self._own_bumps = 0
+                self._changes = set()
+                interval = self.check_interval() if callable(self.check_interval) else self.check_interval
+                self._next_check = now + interval
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def committed(self, count, changes):
+        """Note ``count`` bumps committed by this process, naming ``changes`` or None if unknown."""
+        with self._lock:
+            if changes is None or self.updater is None or self._value is None:
+                self._value = None
+            else:
+                self._own_bumps += count
+                self._changes |= changes
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_watched_versions(session, flush_context, instances):
+    changed = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if session.is_modified(obj)
+    ]
+    for name, models in _watched.items():
+        if any(isinstance(obj, models) for obj in changed):
+            bump_version(session, name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_local_caches(session):
+    for name, (count, changes) in session.info.pop('bumped_caches', {}).items():
+        for cache in _caches.get(name, ()):
+            cache.committed(count, changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_bumps(session):
+    session.info.pop('bumped_caches', None)
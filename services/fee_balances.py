@@ -0,0 +1,70 @@
+from models import db, Student, YearlyFees, FeesCollection
+
+
+def paid_totals_subquery():
+    """Total amount paid per (student_id, academic_year)."""
+    return (
+        db.session.query(
+            FeesCollection.student_id.label('student_id'),
+            FeesCollection.academic_year.label('academic_year'),
+            db.func.sum(FeesCollection.amount_paid).label('total_paid'),
+        )
+        .group_by(FeesCollection.student_id, FeesCollection.academic_year)
+        .subquery()
+    )
+
+
+def fee_balances(grade_level, academic_year=None, class_id=None, outstanding_only=False):
+    """Return one balance row per (student, academic year) for a grade level.
+
+    Payments are summed in a single grouped aggregate and joined against
+    yearly_fees, so the cost does not grow with the number of students.
+    """
+    paid = paid_totals_subquery()
+    total_paid = db.func.coalesce(paid.c.total_paid, 0)
+    balance = YearlyFees.fee_amount - total_paid
+
+    query = (
+        db.session.query(
+            Student.student_id,
+            Student.first_name,
+            Student.last_name,
+            YearlyFees.academic_year,
+            YearlyFees.fee_amount,
+            total_paid.label('total_paid'),
+            balance.label('balance'),
+        )
+        .join(YearlyFees, YearlyFees.grade_level == Student.grade_level)
+        .outerjoin(
+            paid,
+            db.and_(
+                paid.c.student_id == Student.student_id,
+                paid.c.academic_year == YearlyFees.academic_year,
+            ),
+        )
+        .filter(Student.grade_level == grade_level)
+    )
+
+    if academic_year:
+        query = query.filter(YearlyFees.academic_year == academic_year)
+
+    if class_id:
+        query = query.filter(Student.class_id == class_id)
+
+    if outstanding_only:
+        query = query.filter(balance > 0)
+
+    query = query.order_by(Student.student_id, YearlyFees.fee_id)
+
+    return [
+        {
+            "student_id": row.student_id,
+            "student_name": f"{row.first_name} {row.last_name}",
+            "academic_year": row.academic_year,
+            "grade_level": grade_level,
+            "total_fee": row.fee_amount,
+            "total_paid": row.total_paid,
+            "balance": row.balance,
+        }
+        for row in query.all()
+    ]
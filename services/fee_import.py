@@ -0,0 +1,103 @@
+from datetime import datetime, date
+
+from models import db, FeesCollection
+from services.bulk_import import BulkImport
+from services.fee_ledger import refresh_student_years
+
+
+def to_python_date(value):
+    if not value:
+        return date.today()  # fallback
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        # Remove 'Z', handle ISO format
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return dt.date()
+    except Exception as e:
+        print(f"Invalid date: {value}, error: {e}")
+        return date.today()
+
+
+class FeeImport(BulkImport):
+    """Bulk import of fee payments.
+
+    Existing reference numbers for a whole chunk are fetched with a single IN
+    query, and duplicates inside the payload are caught before they reach the
+    database.
+    """
+
+    table = FeesCollection.__table__
+    label = "fee entries"
+    error_key = "reference_number"
+    audit_action = "IMPORT_FEES"
+
+    def __init__(self, chunk_size=1000, on_progress=None):
+        super().__init__(chunk_size, on_progress)
+        self._seen_references = set()
+
+    def validate(self, idx, item):
+        student_id = item.get('student_id')
+        academic_year = item.get('academic_year')
+        amount_paid = item.get('amount_paid')
+        reference_number = item.get('reference_number') or f"REF-{student_id}-{academic_year}"
+
+        # Skip incomplete rows
+        if not all([student_id, academic_year, amount_paid is not None]):
+            self.error(idx, reference_number, "Missing required fields")
+            return None
+
+        try:
+            student_id = int(student_id)
+            amount_paid = float(amount_paid)
+        except (TypeError, ValueError) as e:
+            self.error(idx, reference_number, str(e))
+            return None
+
+        return {
+            "student_id": student_id,
+            "reference_number": str(reference_number),
+            "amount_paid": amount_paid,
+            "payment_date": to_python_date(item.get('payment_date')),
+            "payment_method": item.get('payment_method') or 'Imported',
+            "academic_year": academic_year,
+        }
+
+    def filter_chunk(self, rows):
+        # Check for duplicate reference numbers in the DB with one query per chunk
+        references = [row['reference_number'] for _, row in rows]
+        existing = set()
+        if references:
+            existing = set(
+                db.session.execute(
+                    db.select(FeesCollection.reference_number)
+                    .where(FeesCollection.reference_number.in_(references))
+                ).scalars()
+            )
+
+        accepted = []
+        for idx, row in rows:
+            reference_number = row['reference_number']
+            if reference_number in existing or reference_number in self._seen_references:
+                self.error(idx, reference_number, "Duplicate reference number")
+                continue
+            self._seen_references.add(reference_number)
+            accepted.append((idx, row))
+        return accepted
+
+    def after_insert(self, rows):
+        # Core inserts bypass the ORM flush hooks, so keep the ledger in step here
+        refresh_student_years(
+            db.session.connection(),
+            {(row['student_id'], row['academic_year']) for row in rows},
+        )
+
+    def entry(self, row):
+        return {
+            "student_id": row['student_id'],
+            "academic_year": row['academic_year'],
+            "amount_paid": row['amount_paid'],
+            "reference_number": row['reference_number']
+        }
@@ -0,0 +1,164 @@
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import db, Student, YearlyFees, FeesCollection, StudentFeeLedger
+from services.batching import chunks, history_values
+
+ledger_table = StudentFeeLedger.__table__
+
+
+def _ledger_source():
+    """Select computing every ledger row from students, yearly_fees and fees_collection."""
+    enrolled = (
+        db.select(Student.student_id, YearlyFees.academic_year)
+        .join(YearlyFees, YearlyFees.grade_level == Student.grade_level)
+    )
+    paying = db.select(FeesCollection.student_id, FeesCollection.academic_year)
+    keys = db.union(enrolled, paying).subquery()
+
+    due = (
+        db.select(YearlyFees.fee_amount)
+        .join(Student, Student.grade_level == YearlyFees.grade_level)
+        .where(
+            Student.student_id == keys.c.student_id,
+            YearlyFees.academic_year == keys.c.academic_year,
+        )
+        .limit(1)
+        .scalar_subquery()
+    )
+    paid = (
+        db.select(db.func.sum(FeesCollection.amount_paid))
+        .where(
+            FeesCollection.student_id == keys.c.student_id,
+            FeesCollection.academic_year == keys.c.academic_year,
+        )
+        .scalar_subquery()
+    )
+    total_due = db.func.coalesce(due, 0)
+    total_paid = db.func.coalesce(paid, 0)
+
+    source = db.select(
+        keys.c.student_id,
+        keys.c.academic_year,
+        total_due,
+        total_paid,
+        total_due - total_paid,
+    )
+    return source, keys
+
+
+def _refresh(connection, scope):
+    """Recompute the ledger rows matched by ``scope``.
+
+    ``scope`` is called with the (student_id, academic_year) columns of a table
+    and returns a filter expression, or None to refresh everything.
+    """
+    source, keys = _ledger_source()
+
+    delete = ledger_table.delete()
+    condition = scope(ledger_table.c.student_id, ledger_table.c.academic_year)
+    if condition is not None:
+        delete = delete.where(condition)
+    connection.execute(delete)
+
+    condition = scope(keys.c.student_id, keys.c.academic_year)
+    if condition is not None:
+        source = source.where(condition)
+    connection.execute(
+        ledger_table.insert().from_select(
+            ['student_id', 'academic_year', 'total_due', 'total_paid', 'balance'], source
+        )
+    )
+
+
+def refresh_student_years(connection, keys):
+    """Refresh the ledger for an iterable of (student_id, academic_year) pairs."""
+    by_year = defaultdict(set)
+    for student_id, academic_year in keys:
+        if student_id is not None and academic_year is not None:
+            by_year[academic_year].add(student_id)
+
+    for academic_year, student_ids in by_year.items():
+        for chunk in chunks(student_ids):
+            _refresh(
+                connection,
+                lambda s, y, chunk=chunk, year=academic_year: db.and_(y == year, s.in_(chunk)),
+            )
+
+
+def refresh_grade_years(connection, grade_years):
+    """Refresh the ledger for every student in the given (grade_level, academic_year) pairs."""
+    for grade_level, academic_year in set(grade_years):
+        if grade_level is None or academic_year is None:
+            continue
+        students = db.select(Student.student_id).where(Student.grade_level == grade_level)
+        _refresh(
+            connection,
+            lambda s, y, students=students, year=academic_year: db.and_(y == year, s.in_(students)),
+        )
+
+
+def refresh_students(connection, student_ids):
+    """Refresh every academic year of the given students."""
+    for chunk in chunks({s for s in student_ids if s is not None}):
+        _refresh(connection, lambda s, y, chunk=chunk: s.in_(chunk))
+
+
+def rebuild_ledger(connection):
+    """Recompute the whole ledger from scratch."""
+    _refresh(connection, lambda s, y: None)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_ledger_changes(session, flush_context, instances):
+    pending = session.info.setdefault('fee_ledger', {
+        'keys': set(), 'grade_years': set(), 'students': set(),
+    })
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, FeesCollection):
+            pending['keys'].update(history_values(obj, 'student_id', 'academic_year'))
+        elif isinstance(obj, YearlyFees):
+            pending['grade_years'].update(history_values(obj, 'grade_level', 'academic_year'))
+        elif isinstance(obj, Student) and obj not in session.deleted:
+            if obj in session.new or inspect(obj).attrs.grade_level.history.has_changes():
+                pending['students'].add(obj.student_id)
+
+    # Ledger rows reference the student, so they have to go before it does
+    deleted_students = [obj.student_id for obj in session.deleted if isinstance(obj, Student)]
+    for chunk in chunks(deleted_students):
+        session.connection().execute(ledger_table.delete().where(ledger_table.c.student_id.in_(chunk)))
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_ledger_changes(session, flush_context):
+    pending = session.info.pop('fee_ledger', None)
+    if not pending:
+        return
+
+    # Student ids of new rows are only known once they have been flushed
+    for obj in session.new:
+        if isinstance(obj, Student):
+            pending['students'].add(obj.student_id)
+
+    connection = session.connection()
+    if pending['keys']:
+        refresh_student_years(connection, pending['keys'])
+    if pending['grade_years']:
+        refresh_grade_years(connection, pending['grade_years'])
+    if pending['students']:
+        refresh_students(connection, pending['students'])
+
+
+@click.command('rebuild-fee-ledger')
+@with_appcontext
+def rebuild_fee_ledger_command():
+    """Rebuild the student_fee_ledger table from fee payments."""
+    rebuild_ledger(db.session.connection())
+    db.session.commit()
+    count = db.session.query(db.func.count()).select_from(StudentFeeLedger).scalar()
+    click.echo(f"Rebuilt fee ledger with {count} rows")
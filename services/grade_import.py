@@ -0,0 +1,202 @@
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+
+from models import db, Grade, Subject
+from services.bulk_import import BulkImport
+from services.grading import percentages, academic_year_for, get_scale_registry
+
+INT_FIELDS = ('student_id', 'subject_id', 'class_id', 'score', 'max_score')
+NUMBER_TYPES = (int, float, np.integer, np.floating)
+
+
+def parse_exam_date(value):
+    # Spreadsheet uploads hand over real dates, JSON payloads use DD/MM/YYYY
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%d/%m/%Y").date()
+
+
+def _int_column(values):
+    """Vectorized ``int(value)``, with a mask of the rows it could convert.
+
+    Rows that are not plain integers (or integer strings) are left out of the
+    mask so the scalar path can raise exactly what ``int()`` would.
+    """
+    numeric = pd.to_numeric(values, errors='coerce')
+    is_str = values.map(lambda v: isinstance(v, str)).astype(bool)
+    is_number = values.map(lambda v: isinstance(v, NUMBER_TYPES) and not isinstance(v, bool)).astype(bool)
+
+    str_ok = is_str & values.where(is_str, '').astype(str).str.fullmatch(r'\s*[+-]?[0-9]+\s*')
+    ok = (str_ok | is_number) & numeric.notna() & np.isfinite(numeric)
+    return np.trunc(numeric.where(ok)), ok
+
+
+def _date_column(values):
+    """Vectorized ``parse_exam_date``, with a mask of the rows it could parse."""
+    is_str = values.map(lambda v: isinstance(v, str)).astype(bool)
+    parsed = pd.to_datetime(values.where(is_str), format="%d/%m/%Y", errors='coerce')
+    dates = parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+    # Spreadsheet cells already hold dates
+    native = values.map(lambda v: isinstance(v, date))
+    dates[native] = values[native].map(parse_exam_date)
+    return dates, parsed.notna() | native
+
+
+class GradeImport(BulkImport):
+    """Bulk import of exam grades.
+
+    Parsing, percentages and grade letters are computed for a whole chunk at
+    once with pandas/NumPy. Rows the vectorized path cannot handle go through
+    ``validate``, which reports the same error the scalar code always has.
+    """
+
+    table = Grade.__table__
+    label = "grade entries"
+    error_key = "student_id"
+    audit_action = "IMPORT_GRADES"
+
+    def __init__(self, chunk_size=1000, on_progress=None):
+        super().__init__(chunk_size, on_progress)
+        self._registry = None
+        self._subject_levels = {}
+
+    def _load_subject_levels(self, subject_ids):
+        missing = {s for s in subject_ids if s not in self._subject_levels}
+        if missing:
+            self._subject_levels.update(
+                db.session.execute(
+                    db.select(Subject.subject_id, Subject.grade_level)
+                    .where(Subject.subject_id.in_(missing))
+                ).all()
+            )
+            for subject_id in missing:
+                self._subject_levels.setdefault(subject_id, None)
+
+    def scale_for(self, subject_id, exam_date):
+        """Compiled grading scale for a subject's grade level in the exam's academic year."""
+        if self._registry is None:
+            self._registry = get_scale_registry()
+        self._load_subject_levels([subject_id])
+        return self._registry.resolve(academic_year_for(exam_date), self._subject_levels[subject_id])
+
+    def validate(self, idx, item):
+        try:
+            student_id = int(item.get('student_id'))
+            subject_id = int(item.get('subject_id'))
+            class_id = int(item.get('class_id'))
+            term = item.get('term')
+            exam_type = item.get('exam_type')
+            score = int(item.get('score'))
+            max_score = int(item.get('max_score'))
+            remarks = item.get('remarks')
+            exam_date = parse_exam_date(item.get('exam_date'))
+
+            # Validate required fields
+            if not all([student_id, subject_id, class_id, term, exam_type, score is not None, max_score is not None]):
+                self.error(idx, student_id, "Missing required fields")
+                return None
+
+            grade = Grade(
+                student_id=student_id,
+                subject_id=subject_id,
+                class_id=class_id,
+                term=term,
+                exam_type=exam_type,
+                score=score,
+                max_score=max_score,
+                remarks=remarks,
+                exam_date=exam_date
+            )
+            grade.calculate_percentage_and_grade(self.scale_for(subject_id, exam_date))
+        except Exception as e:
+            self.error(idx, item.get('student_id'), str(e))
+            return None
+
+        return {
+            "student_id": student_id,
+            "subject_id": subject_id,
+            "class_id": class_id,
+            "term": term,
+            "exam_type": exam_type,
+            "score": score,
+            "max_score": max_score,
+            "percentage": grade.percentage,
+            "grade_letter": grade.grade_letter,
+            "remarks": remarks,
+            "exam_date": exam_date,
+        }
+
+    def validate_chunk(self, chunk):
+        if not chunk:
+            return []
+        items = [item for _, item in chunk]
+        columns = {
+            name: pd.Series([item.get(name) for item in items], dtype=object)
+            for name in INT_FIELDS + ('term', 'exam_type', 'remarks', 'exam_date')
+        }
+
+        ok = np.ones(len(items), dtype=bool)
+        ints = {}
+        for name in INT_FIELDS:
+            ints[name], parsed = _int_column(columns[name])
+            ok &= parsed.to_numpy()
+        exam_dates, parsed = _date_column(columns['exam_date'])
+        ok &= parsed.to_numpy()
+
+        # Validate required fields
+        for name in ('student_id', 'subject_id', 'class_id'):
+            ok &= (ints[name] != 0).to_numpy()
+        for name in ('term', 'exam_type'):
+            ok &= columns[name].map(bool).to_numpy()
+
+        percentage = percentages(ints['score'], ints['max_score'])
+
+        # Grade each (subject, exam date) group with the scale of its grade level and academic year
+        letters = np.full(len(items), None, dtype=object)
+        subject_ids = ints['subject_id'].to_numpy()
+        groups = pd.DataFrame({
+            'subject_id': subject_ids,
+            'exam_date': exam_dates,
+        })[ok].groupby(['subject_id', 'exam_date']).indices
+        self._load_subject_levels(int(subject_id) for subject_id, _ in groups)
+        for (subject_id, exam_date), positions in groups.items():
+            rows_at = np.flatnonzero(ok)[positions]
+            scale = self.scale_for(int(subject_id), exam_date)
+            letters[rows_at] = scale.letters_for(percentage[rows_at])
+
+        values = {name: ints[name].tolist() for name in INT_FIELDS}
+        percentage = percentage.tolist()
+        rows = []
+        for i, (idx, item) in enumerate(chunk):
+            if not ok[i]:
+                row = self.validate(idx, item)
+                if row is not None:
+                    rows.append((idx, row))
+                continue
+            rows.append((idx, {
+                "student_id": int(values['student_id'][i]),
+                "subject_id": int(values['subject_id'][i]),
+                "class_id": int(values['class_id'][i]),
+                "term": item.get('term'),
+                "exam_type": item.get('exam_type'),
+                "score": int(values['score'][i]),
+                "max_score": int(values['max_score'][i]),
+                "percentage": None if np.isnan(percentage[i]) else percentage[i],
+                "grade_letter": letters[i],
+                "remarks": item.get('remarks'),
+                "exam_date": exam_dates[i],
+            }))
+        return rows
+
+    def entry(self, row):
+        return {
+            "student_id": row['student_id'],
+            "subject_id": row['subject_id'],
+            "term": row['term'],
+            "score": row['score']
+        }
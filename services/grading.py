@@ -0,0 +1,185 @@
+from bisect import bisect_right
+from datetime import date
+
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, Grade, GradingScale, GradingScaleBand, Subject, GRADE_CUTOFFS, FAILING_GRADE
+from services.cache_versions import VersionedCache, watch_models
+
+CACHE_NAME = 'grading_scales'
+
+watch_models(CACHE_NAME, GradingScale, GradingScaleBand)
+
+
+def percentages(score, max_score):
+    """Vectorized ``Grade.calculate_percentage_and_grade`` percentage.
+
+    Returns NaN where the scalar method would leave the percentage unset
+    (missing score or a zero max_score).
+    """
+    score = np.asarray(score, dtype=float)
+    max_score = np.asarray(max_score, dtype=float)
+    valid = ~np.isnan(score) & (max_score != 0) & ~np.isnan(max_score)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = (score / max_score) * 100
+        result = np.round(raw, 2)
+
+        # np.round and the builtin round can disagree on values sitting on a
+        # rounding tie, redo those few with the builtin so results match exactly
+        ties = valid & (np.abs(np.abs(raw * 100) % 1 - 0.5) < 1e-6)
+    for i in np.flatnonzero(ties):
+        result[i] = round(float(raw[i]), 2)
+
+    return np.where(valid, result, np.nan)
+
+
+class CompiledScale:
+    """A grading scale as a sorted array of cutoffs.
+
+    A percentage earns the letter of the highest cutoff it reaches, found by
+    binary search, or ``failing`` below the lowest one.
+    """
+
+    def __init__(self, bands, failing=FAILING_GRADE):
+        bands = sorted(bands)
+        self.thresholds = [float(cutoff) for cutoff, _ in bands]
+        self.letters = [letter for _, letter in bands]
+        self.failing = failing
+        self._choices = np.array([failing] + self.letters, dtype=object)
+
+    def letter_for(self, percentage):
+        i = bisect_right(self.thresholds, percentage)
+        return self.letters[i - 1] if i else self.failing
+
+    def letters_for(self, percentage):
+        """Vectorized ``letter_for``, NaN percentages map to None."""
+        percentage = np.asarray(percentage, dtype=float)
+        letters = self._choices[np.searchsorted(self.thresholds, percentage, side='right')]
+        letters[np.isnan(percentage)] = None
+        return letters
+
+
+DEFAULT_SCALE = CompiledScale(GRADE_CUTOFFS)
+
+
+def academic_year_for(day):
+    """Academic year ("2024-2025") that ``day`` falls in."""
+    start_month = current_app.config['ACADEMIC_YEAR_START_MONTH']
+    first_year = day.year if day.month >= start_month else day.year - 1
+    return f"{first_year}-{first_year + 1}"
+
+
+def academic_year_bounds(academic_year):
+    """First day of ``academic_year`` and first day of the following one."""
+    start_month = current_app.config['ACADEMIC_YEAR_START_MONTH']
+    first_year = int(academic_year.split('-')[0])
+    return date(first_year, start_month, 1), date(first_year + 1, start_month, 1)
+
+
+class ScaleRegistry:
+    """Every grading scale, compiled, keyed by (academic_year, grade_level)."""
+
+    def __init__(self, scales):
+        self.scales = scales
+
+    def resolve(self, academic_year, grade_level):
+        """Most specific scale for a year and level, falling back to the built-in one."""
+        for key in ((academic_year, grade_level), (academic_year, None), (None, grade_level), (None, None)):
+            if key in self.scales:
+                return self.scales[key]
+        return DEFAULT_SCALE
+
+
+def _load_scales():
+    scales = {}
+    for scale in GradingScale.query.options(db.selectinload(GradingScale.bands)).all():
+        scales[(scale.academic_year, scale.grade_level)] = CompiledScale(
+            (band.min_percentage, band.grade_letter) for band in scale.bands
+        )
+    return ScaleRegistry(scales)
+
+
+_scales_cache = VersionedCache(CACHE_NAME, _load_scales)
+
+
+def get_scale_registry():
+    """Compiled grading scales, reloaded only when the scale version changes."""
+    return _scales_cache.get()
+
+
+def _scale_scope(academic_year, grade_level):
+    """Filter selecting the grades a scale (or a recompute run) applies to."""
+    conditions = []
+    if academic_year:
+        start, end = academic_year_bounds(academic_year)
+        conditions += [Grade.exam_date >= start, Grade.exam_date < end]
+    if grade_level:
+        subjects = db.select(Subject.subject_id).where(Subject.grade_level == grade_level)
+        conditions.append(Grade.subject_id.in_(subjects))
+    return conditions
+
+
+def recompute_grades(academic_year=None, grade_level=None, chunk_size=5000):
+    """Recompute percentage and grade_letter, a chunk of rows at a time.
+
+    Percentages come from ``percentages`` and letters from the scale
+    ``ScaleRegistry.resolve`` picks for each row, the same arithmetic as
+    ``Grade.calculate_percentage_and_grade`` and the grade import, so rows on
+    a rounding boundary get the letter the API would give them. Each chunk is
+    written with one executemany UPDATE. Returns the number of rows updated.
+    """
+    registry = get_scale_registry()
+    grades = Grade.__table__
+    query = (
+        db.select(grades.c.grade_id, grades.c.score, grades.c.max_score, grades.c.exam_date, Subject.grade_level)
+        .outerjoin(Subject, Subject.subject_id == grades.c.subject_id)
+        .where(*_scale_scope(academic_year, grade_level))
+        .order_by(grades.c.grade_id)
+        .limit(chunk_size)
+    )
+    statement = (
+        grades.update()
+        .where(grades.c.grade_id == db.bindparam('b_grade_id'))
+        .values(percentage=db.bindparam('b_percentage'), grade_letter=db.bindparam('b_grade_letter'))
+    )
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(grades.c.grade_id > last_id)).all()
+        if not rows:
+            break
+        last_id = rows[-1].grade_id
+
+        percentage = percentages([row.score for row in rows], [row.max_score for row in rows])
+        letters = np.empty(len(rows), dtype=object)
+        rows_by_scope = {}
+        for i, row in enumerate(rows):
+            rows_by_scope.setdefault((academic_year_for(row.exam_date), row.grade_level), []).append(i)
+        for (year, level), rows_at in rows_by_scope.items():
+            letters[rows_at] = registry.resolve(year, level).letters_for(percentage[rows_at])
+
+        updated += db.session.execute(statement, [
+            {
+                "b_grade_id": row.grade_id,
+                "b_percentage": None if np.isnan(value) else float(value),
+                "b_grade_letter": letter,
+            }
+            for row, value, letter in zip(rows, percentage, letters)
+        ]).rowcount
+        db.session.commit()
+    return updated
+
+
+@click.command('recompute-grades')
+@click.option('--academic-year', default=None, help='Only grades with an exam date in this year, e.g. 2024-2025')
+@click.option('--grade-level', default=None, type=click.Choice(['F1', 'F2', 'F3', 'F4']))
+@with_appcontext
+def recompute_grades_command(academic_year, grade_level):
+    """Recompute grade percentages and letters from the grading scales."""
+    updated = recompute_grades(academic_year, grade_level)
+    click.echo(f"Applied {updated} grade row updates")
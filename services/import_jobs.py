@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.utils import secure_filename
+
+from models import db, ImportJob
+from services.fee_import import FeeImport
+from services.grade_import import GradeImport
+from services.spreadsheets import check_import_file, iter_rows
+
+IMPORTERS = {
+    'fees': FeeImport,
+    'grades': GradeImport,
+}
+
+# Progress updates only carry the newest errors, the full list is in the result
+RECENT_ERRORS = 50
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Worker pool shared by every import job of this process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['IMPORT_JOB_WORKERS'],
+                thread_name_prefix='import-job',
+            )
+        return _executor
+
+
+def submit_import(kind, chunk_size, rows=None, upload=None):
+    """Queue an import of ``rows`` or of an uploaded file and return its ImportJob.
+
+    Job state lives in the import_jobs table, so any worker process can answer
+    progress requests for it.
+    """
+    job = ImportJob(job_id=uuid.uuid4().hex, kind=kind, status='queued')
+
+    path = None
+    if upload is not None:
+        check_import_file(upload.filename)
+        folder = current_app.config['IMPORT_SPOOL_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        # Spool the upload to disk, the request stream is gone once we respond
+        path = os.path.join(folder, f"{job.job_id}_{secure_filename(upload.filename)}")
+        upload.save(path)
+
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    get_executor().submit(_run_job, app, job.job_id, kind, chunk_size, rows, path)
+    return job
+
+
+def _record_progress(job, importer):
+    job.processed_rows = importer.processed
+    job.imported_rows = len(importer.imported_entries)
+    if job.error_count != len(importer.errors):
+        job.error_count = len(importer.errors)
+        job.errors = json.dumps(importer.errors[-RECENT_ERRORS:], default=str)
+
+
+def _run_job(app, job_id, kind, chunk_size, rows, path):
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        def on_progress(importer):
+            _record_progress(job, importer)
+            db.session.commit()
+
+        try:
+            importer = IMPORTERS[kind](chunk_size=chunk_size, on_progress=on_progress)
+            if path:
+                with open(path, 'rb') as stream:
+                    importer.run(iter_rows(stream, path))
+            else:
+                importer.run(rows)
+
+            response, status = importer.response()
+            _record_progress(job, importer)
+            job.result = json.dumps(response, default=str)
+            job.result_status = status
+            job.status = 'finished'
+        except Exception as e:
+            app.logger.exception("Import job %s failed", job_id)
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.status = 'failed'
+            job.message = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            db.session.remove()
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+def fail_interrupted_jobs():
+    """Mark jobs left queued or running by a previous process as failed.
+
+    Jobs run in the process that accepted them, so call this only when no other
+    server process is running imports (e.g. before the workers start).
+    """
+    count = ImportJob.query.filter(ImportJob.status.in_(['queued', 'running'])).update(
+        {'status': 'failed', 'message': 'Interrupted by a server restart',
+         'finished_at': datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return count
+
+
+@click.command('fail-interrupted-imports')
+@with_appcontext
+def fail_interrupted_imports_command():
+    """Mark import jobs left queued or running as failed."""
+    count = fail_interrupted_jobs()
+    click.echo(f"Marked {count} interrupted import jobs as failed")
+
+
+def job_to_dict(job):
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "status": job.status,
+        "processed_rows": job.processed_rows or 0,
+        "imported_rows": job.imported_rows or 0,
+        "error_count": job.error_count or 0,
+        "errors": json.loads(job.errors) if job.errors else [],
+        "message": job.message,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,167 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import request, current_app
+from flask_restful import marshal
+from sqlalchemy import inspect
+
+from models import db
+
+
+class ListQueryError(ValueError):
+    """A fields, sort, or cursor parameter the endpoint doesn't accept."""
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=lambda v: v.isoformat())
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise ListQueryError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ListQueryError("Invalid cursor")
+    return values
+
+
+def _python_value(column, value):
+    """Turn a cursor value back into what ``column`` compares against."""
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise ListQueryError("Invalid cursor")
+
+
+class ListQuery:
+    """Paging, sorting and field selection shared by the list endpoints.
+
+    Query parameters understood by ``page``:
+
+    * ``fields=a,b`` - marshal only these fields, and load only the columns
+      they need.
+    * ``sort=name`` or ``sort=-name`` - one of ``sort_keys`` (non-nullable
+      columns), ties broken by the primary key.
+    * ``limit`` and ``after`` - keyset pagination, pass the X-Next-Cursor
+      header of a response as ``after`` to get the next page.
+    * ``count=false`` - skip the COUNT query behind the X-Total-Count header.
+
+    ``field_columns`` maps fields that aren't a column of ``model`` to the
+    attributes they read, and ``field_options`` to loader options, e.g. a
+    joinedload for a field taken from a relationship.
+    """
+
+    def __init__(self, model, fields, sort_keys=(), default_sort=None,
+                 field_columns=None, field_options=None):
+        self.model = model
+        self.fields = fields
+        self.key = inspect(model).primary_key[0]
+        self.sort_keys = {name: getattr(model, name) for name in sort_keys}
+        self.default_sort = default_sort or self.key.key
+        self.field_columns = field_columns or {}
+        self.field_options = field_options or {}
+
+    def _selected_fields(self):
+        names = request.args.get('fields')
+        if not names:
+            return self.fields
+        selected = {}
+        for name in (n.strip() for n in names.split(',')):
+            if name not in self.fields:
+                raise ListQueryError(f"Unknown field '{name}', expected some of: {', '.join(self.fields)}")
+            selected[name] = self.fields[name]
+        return selected
+
+    def _sort(self):
+        sort = request.args.get('sort') or self.default_sort
+        descending = sort.startswith('-')
+        name = sort.lstrip('-')
+        if name == self.key.key:
+            column = getattr(self.model, name)
+        elif name in self.sort_keys:
+            column = self.sort_keys[name]
+        else:
+            keys = [self.key.key] + list(self.sort_keys)
+            raise ListQueryError(f"Cannot sort by '{name}', expected one of: {', '.join(keys)}")
+        return column, descending
+
+    def _load_options(self, selected, sort_column):
+        attributes = {getattr(self.model, self.key.key), sort_column}
+        options = []
+        for name in selected:
+            if name in self.field_columns:
+                attributes.update(self.field_columns[name])
+            elif name not in self.field_options and hasattr(self.model, name):
+                attributes.add(getattr(self.model, name))
+            options.extend(self.field_options.get(name, ()))
+        return [db.load_only(*attributes)] + options
+
+    def page(self, query):
+        """One page of ``query`` as a Flask-RESTful (body, status, headers) tuple."""
+        try:
+            selected = self._selected_fields()
+            sort_column, descending = self._sort()
+            after = request.args.get('after')
+            after = decode_cursor(after) if after else None
+        except ListQueryError as e:
+            return {"message": str(e)}, 400
+
+        limit = max(1, min(request.args.get('limit', type=int) or current_app.config['LIST_PAGE_SIZE'], 1000))
+        key_column = getattr(self.model, self.key.key)
+
+        headers = {}
+        if request.args.get('count', 'true').lower() != 'false':
+            total = query.with_entities(db.func.count(key_column)).order_by(None).scalar()
+            headers['X-Total-Count'] = str(total)
+
+        by_key = sort_column.key == key_column.key
+        if after:
+            try:
+                sort_value = _python_value(sort_column, after[0])
+                key_value = _python_value(key_column, after[1])
+            except ListQueryError as e:
+                return {"message": str(e)}, 400
+            if by_key:
+                query = query.filter(key_column < key_value if descending else key_column > key_value)
+            elif descending:
+                query = query.filter(db.or_(
+                    sort_column < sort_value,
+                    db.and_(sort_column == sort_value, key_column < key_value),
+                ))
+            else:
+                query = query.filter(db.or_(
+                    sort_column > sort_value,
+                    db.and_(sort_column == sort_value, key_column > key_value),
+                ))
+
+        order = [sort_column] if by_key else [sort_column, key_column]
+        if descending:
+            order = [column.desc() for column in order]
+        # Fetch one extra row to know whether there is another page
+        rows = (
+            query.options(*self._load_options(selected, sort_column))
+            .order_by(None).order_by(*order)
+            .limit(limit + 1)
+            .all()
+        )
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            headers['X-Next-Cursor'] = encode_cursor([
+                getattr(last, sort_column.key), getattr(last, key_column.key),
+            ])
+        return marshal(rows, selected), 200, headers
@@ -0,0 +1,59 @@
+from models import db, Student
+
+# Trigram FTS5 index over students.first_name/last_name, kept in sync by
+# triggers (SQLite). PostgreSQL gets pg_trgm GIN indexes on the columns instead.
+FTS_TABLE = 'student_name_fts'
+
+# Trigram indexes only help with terms of at least three characters
+MIN_INDEXED_TERM = 3
+
+_fts_available = {}
+
+
+def _has_fts_table(engine):
+    if engine not in _fts_available:
+        with engine.connect() as connection:
+            _fts_available[engine] = connection.execute(
+                db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first() is not None
+    return _fts_available[engine]
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def name_contains(column, term):
+    """Condition matching students whose ``column`` (first_name or last_name) contains ``term``.
+
+    Uses the trigram FTS5 table on SQLite when the migration created it, and
+    a plain ILIKE otherwise, which PostgreSQL serves from its trigram
+    indexes. Callers must have ``students`` in the query, joined explicitly.
+    """
+    term = term.strip()
+    engine = db.engine
+    if engine.dialect.name == 'sqlite' and len(term) >= MIN_INDEXED_TERM and _has_fts_table(engine):
+        phrase = '"' + term.replace('"', '""') + '"'
+        # unique=True, or several name filters in one statement would share one value
+        matches = db.text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query").bindparams(
+            db.bindparam('query', f"{column.key} : {phrase}", unique=True),
+        ).columns(rowid=db.Integer)
+        return Student.student_id.in_(matches)
+    return column.ilike(_like_pattern(term), escape='\\')
+
+
+def filter_student_names(query, first_name=None, last_name=None, name=None):
+    """Apply the first_name, last_name and name (either of the two) search filters."""
+    if first_name:
+        query = query.filter(name_contains(Student.first_name, first_name))
+    if last_name:
+        query = query.filter(name_contains(Student.last_name, last_name))
+    if name:
+        query = query.filter(db.or_(
+            name_contains(Student.first_name, name),
+            name_contains(Student.last_name, name),
+        ))
+    return query
+
@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing slot is taken, or a hash did not finish in time."""
+
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_pool():
+    """Process pool doing the key derivation, and the semaphore bounding its queue."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            config = current_app.config
+            workers = config['PASSWORD_HASH_WORKERS']
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _slots = threading.BoundedSemaphore(workers + config['PASSWORD_HASH_QUEUE_SIZE'])
+        return _executor, _slots
+
+
+def _run(fn, *args):
+    """Run ``fn`` in the hashing pool, waiting at most PASSWORD_HASH_TIMEOUT seconds.
+
+    Callers that find the pool full are turned away at once with
+    PasswordHasherBusy rather than piling up behind the hashes in flight.
+    """
+    config = current_app.config
+    if not config['PASSWORD_HASH_WORKERS']:
+        return fn(*args)
+
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordHasherBusy("Too many password checks in progress")
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    # The slot is held until the worker is done, not just until we stop waiting
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=config['PASSWORD_HASH_TIMEOUT'])
+    except TimeoutError:
+        raise PasswordHasherBusy("Password check timed out")
+
+
+def hash_password(password):
+    """Hash ``password`` with the configured method and salt length."""
+    config = current_app.config
+    return _run(generate_password_hash, password,
+                config['PASSWORD_HASH_METHOD'], config['PASSWORD_SALT_LENGTH'])
+
+
+def hash_passwords(passwords):
+    """Hash many passwords in parallel, returning the hashes in order.
+
+    At most PASSWORD_HASH_WORKERS of them are queued at once and each takes a
+    slot like any other hash, so a bulk job leaves room for logins.
+    """
+    config = current_app.config
+    method, salt_length = config['PASSWORD_HASH_METHOD'], config['PASSWORD_SALT_LENGTH']
+    if not config['PASSWORD_HASH_WORKERS']:
+        return [generate_password_hash(p, method, salt_length) for p in passwords]
+
+    executor, slots = _get_pool()
+    in_flight = threading.BoundedSemaphore(config['PASSWORD_HASH_WORKERS'])
+    futures = []
+    try:
+        for password in passwords:
+            in_flight.acquire()
+            if not slots.acquire(timeout=config['PASSWORD_HASH_TIMEOUT']):
+                in_flight.release()
+                raise PasswordHasherBusy("Too many password checks in progress")
+            future = executor.submit(generate_password_hash, password, method, salt_length)
+            future.add_done_callback(lambda _: (slots.release(), in_flight.release()))
+            futures.append(future)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    wait(futures)
+    return [future.result() for future in futures]
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=None)
+def _expanded_method(method):
+    """``method`` as werkzeug writes it into hashes, e.g. "scrypt" as "scrypt:32768:8:1".
+
+    Taken from one throwaway hash, so werkzeug's own defaults fill in
+    whatever the configured method leaves out.
+    """
+    return generate_password_hash('', method, 1).partition('$')[0]
+
+
+def needs_rehash(password_hash):
+    """True if ``password_hash`` was made with other parameters than the configured ones."""
+    config = current_app.config
+    method, _, rest = password_hash.partition('$')
+    salt = rest.partition('$')[0]
+    return method != _expanded_method(config['PASSWORD_HASH_METHOD']) or len(salt) != config['PASSWORD_SALT_LENGTH']
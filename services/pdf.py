@@ -0,0 +1,99 @@
+import zlib
+
+# A4 in points
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+
+FONTS = {False: b'F1', True: b'F2'}
+
+_FONT_RESOURCES = b'/Font << /F1 3 0 R /F2 4 0 R >>'
+
+
+def _escape(text):
+    data = str(text).encode('cp1252', 'replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)').replace(b'\r', b'').replace(b'\n', b' ')
+
+
+def _stream(dictionary, data):
+    data = zlib.compress(data)
+    return b'<< %s /Length %d /Filter /FlateDecode >>\nstream\n' % (dictionary, len(data)) + data + b'\nendstream'
+
+
+class Drawing:
+    """Content stream of text, lines and boxes, in points from the bottom left corner."""
+
+    def __init__(self):
+        self._ops = []
+
+    def text(self, x, y, text, size=10, bold=False):
+        self._ops.append(b'BT /%s %.2f Tf %.2f %.2f Td (%s) Tj ET' % (FONTS[bold], size, x, y, _escape(text)))
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self._ops.append(b'%.2f w %.2f %.2f m %.2f %.2f l S' % (width, x1, y1, x2, y2))
+
+    def rect(self, x, y, width, height, gray=None):
+        """Outline of a box, or a box filled with ``gray`` (0 black to 1 white)."""
+        if gray is None:
+            self._ops.append(b'%.2f %.2f %.2f %.2f re S' % (x, y, width, height))
+        else:
+            self._ops.append(b'q %.2f g %.2f %.2f %.2f %.2f re f Q' % (gray, x, y, width, height))
+
+    def getvalue(self):
+        return b'\n'.join(self._ops)
+
+
+class PageTemplate:
+    """Static layout shared by every page of every document rendered with it.
+
+    The drawing is compressed once and written as a Form XObject that each
+    page paints before its own content, and the objects that never change
+    (catalog, fonts, template) are serialized once too, so a document only
+    costs its variable text.
+    """
+
+    def __init__(self, drawing, width=PAGE_WIDTH, height=PAGE_HEIGHT):
+        self.width = width
+        self.height = height
+        objects = {
+            1: b'<< /Type /Catalog /Pages 2 0 R >>',
+            3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            4: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+            5: _stream(
+                b'/Type /XObject /Subtype /Form /BBox [0 0 %d %d] /Resources << %s >>' % (width, height, _FONT_RESOURCES),
+                drawing.getvalue(),
+            ),
+        }
+        self.prefix = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.offsets = {}
+        for number, body in objects.items():
+            self.offsets[number] = len(self.prefix)
+            self.prefix += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+
+    def render(self, pages):
+        """PDF bytes of ``pages``, a list of Drawings each painted over the template."""
+        out = [self.prefix]
+        size = len(self.prefix)
+        offsets = dict(self.offsets)
+
+        def add(number, body):
+            nonlocal size
+            obj = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+            offsets[number] = size
+            out.append(obj)
+            size += len(obj)
+
+        kids = []
+        for i, page in enumerate(pages):
+            number = 6 + 2 * i
+            kids.append(b'%d 0 R' % number)
+            add(number, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                        b'/Resources << %s /XObject << /Tpl 5 0 R >> >> /Contents %d 0 R >>'
+                % (self.width, self.height, _FONT_RESOURCES, number + 1))
+            add(number + 1, _stream(b'', b'q /Tpl Do Q\n' + page.getvalue()))
+        add(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids)))
+
+        count = max(offsets) + 1
+        xref = [b'xref\n0 %d\n0000000000 65535 f \n' % count]
+        xref.extend(b'%010d 00000 n \n' % offsets[number] for number in range(1, count))
+        out.extend(xref)
+        out.append(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (count, size))
+        return b''.join(out)
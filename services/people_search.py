@@ -0,0 +1,339 @@
+import re
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import db, User, Student, Parent, Teacher
+from services.batching import chunks
+from services.cache_versions import VersionedCache, bump_version
+
+CACHE_NAME = 'people_search'
+
+KINDS = ('student', 'parent', 'teacher', 'user')
+
+# Model of each kind, its id column and the columns its index entry is built from
+INDEXED = {
+    'student': (Student, 'student_id', ('first_name', 'last_name', 'grade_level', 'class_id')),
+    'parent': (Parent, 'parent_id', ('first_name', 'last_name', 'phone_number')),
+    'teacher': (Teacher, 'teacher_id', ('first_name', 'last_name', 'phone_number')),
+    'user': (User, 'user_id', ('username', 'email', 'first_name', 'last_name', 'role')),
+}
+
+# Points a query token earns per matching term
+EXACT, PREFIX, TYPO = 3, 2, 1
+
+# Shortest query token a one-letter typo is forgiven in
+MIN_TYPO_LENGTH = 4
+
+_token_re = re.compile(r'[^\W_]+')
+_phone_query_re = re.compile(r'\s*\+?[\d\s().-]*\d[\d\s().-]*')
+
+
+def tokenize(text):
+    return _token_re.findall(text.lower()) if text else []
+
+
+def _digits(phone):
+    return re.sub(r'\D', '', phone or '')
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a, b):
+    """True if ``a`` and ``b`` differ by at most one insertion, deletion, substitution or transposition."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class PeopleIndex:
+    """In-memory inverted index of people, searched by ranked prefix and typo-tolerant matching.
+
+    ``documents`` maps (kind, id) to the result returned for it. Terms are kept
+    sorted for prefix lookups, and every term's one-letter deletions point
+    back at it so near misses are found without scanning the vocabulary.
+    Phone numbers are matched separately, on any run of their digits, so
+    local and international formats find each other.
+
+    Once frozen, the index is only changed through a ``copy()``: postings and
+    deletion lists are replaced rather than modified, so searches still
+    running on the original are unaffected.
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.tokens = {}
+        self.postings = {}
+        self.terms = []
+        self.deletes = {}
+        self.phones = {}
+        self._frozen = False
+
+    def add(self, key, document, tokens, phone=None):
+        """Index ``document`` under ``key``, replacing what was indexed under it before."""
+        self.remove(key)
+        tokens = set(tokens)
+        self.documents[key] = document
+        self.tokens[key] = tokens
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                self.postings[token] = {key}
+                if self._frozen:
+                    self._add_term(token)
+            elif self._frozen:
+                self.postings[token] = postings | {key}
+            else:
+                postings.add(key)
+        if _digits(phone):
+            self.phones[key] = _digits(phone)
+
+    def remove(self, key):
+        if key not in self.documents:
+            return
+        del self.documents[key]
+        self.phones.pop(key, None)
+        for token in self.tokens.pop(key):
+            postings = self.postings[token] - {key}
+            if postings:
+                self.postings[token] = postings
+            else:
+                del self.postings[token]
+                self._remove_term(token)
+
+    def freeze(self):
+        self.terms = sorted(self.postings)
+        for term in self.terms:
+            if len(term) >= MIN_TYPO_LENGTH - 1:
+                for variant in _deletes(term):
+                    self.deletes.setdefault(variant, []).append(term)
+        self._frozen = True
+
+    def copy(self):
+        other = PeopleIndex()
+        other.documents = dict(self.documents)
+        other.tokens = dict(self.tokens)
+        other.postings = dict(self.postings)
+        other.terms = list(self.terms)
+        other.deletes = dict(self.deletes)
+        other.phones = dict(self.phones)
+        other._frozen = self._frozen
+        return other
+
+    def _add_term(self, term):
+        self.terms.insert(bisect_left(self.terms, term), term)
+        if len(term) >= MIN_TYPO_LENGTH - 1:
+            for variant in _deletes(term):
+                self.deletes[variant] = self.deletes.get(variant, []) + [term]
+
+    def _remove_term(self, term):
+        if not self._frozen:
+            return
+        del self.terms[bisect_left(self.terms, term)]
+        if len(term) >= MIN_TYPO_LENGTH - 1:
+            for variant in _deletes(term):
+                terms = [other for other in self.deletes.get(variant, ()) if other != term]
+                if terms:
+                    self.deletes[variant] = terms
+                else:
+                    self.deletes.pop(variant, None)
+
+    def _matches(self, token):
+        """Score of every document matching ``token``."""
+        scores = {}
+
+        def credit(term, points):
+            for key in self.postings[term]:
+                if scores.get(key, 0) < points:
+                    scores[key] = points
+
+        # Prefix matches, the exact term included
+        i = bisect_left(self.terms, token)
+        while i < len(self.terms) and self.terms[i].startswith(token):
+            term = self.terms[i]
+            credit(term, EXACT if term == token else PREFIX)
+            i += 1
+
+        if len(token) >= MIN_TYPO_LENGTH:
+            candidates = set(self.deletes.get(token, ()))
+            for variant in _deletes(token) | {token}:
+                candidates.update(self.deletes.get(variant, ()))
+                if variant in self.postings:
+                    candidates.add(variant)
+            for term in candidates:
+                if term != token and _within_one_edit(term, token):
+                    credit(term, TYPO)
+        return scores
+
+    def _phone_matches(self, query):
+        # A trunk prefix like the leading 0 of 0712... is not part of +254 712...
+        digits = _digits(query).lstrip('0')
+        if len(digits) < 3:
+            return {}
+        return {key: EXACT for key, phone in self.phones.items() if digits in phone}
+
+    def search(self, query, kinds=KINDS, limit=20):
+        """Documents matching every token of ``query``, best first."""
+        if _phone_query_re.fullmatch(query):
+            totals = {key: score for key, score in self._phone_matches(query).items() if key[0] in kinds}
+            return self._ranked(totals, limit)
+
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        totals = None
+        for token in tokens:
+            scores = self._matches(token)
+            if totals is None:
+                totals = {key: score for key, score in scores.items() if key[0] in kinds}
+            else:
+                totals = {key: total + scores[key] for key, total in totals.items() if key in scores}
+            if not totals:
+                return []
+        return self._ranked(totals, limit)
+
+    def _ranked(self, totals, limit):
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], self.documents[item[0]]['name'] or ''))
+        return [dict(self.documents[key], score=score) for key, score in ranked[:limit]]
+
+
+def _full_name(first_name, last_name):
+    return ' '.join(part for part in (first_name, last_name) if part) or None
+
+
+def _student_entries(*where):
+    for student_id, first_name, last_name, grade_level, class_id in db.session.execute(
+        db.select(Student.student_id, Student.first_name, Student.last_name, Student.grade_level, Student.class_id)
+        .where(*where)
+    ):
+        yield ('student', student_id), {
+            "type": "student",
+            "id": student_id,
+            "name": _full_name(first_name, last_name),
+            "grade_level": grade_level,
+            "class_id": class_id,
+        }, tokenize(first_name) + tokenize(last_name), None
+
+
+def _parent_entries(*where):
+    for parent_id, first_name, last_name, phone_number in db.session.execute(
+        db.select(Parent.parent_id, Parent.first_name, Parent.last_name, Parent.phone_number).where(*where)
+    ):
+        yield ('parent', parent_id), {
+            "type": "parent",
+            "id": parent_id,
+            "name": _full_name(first_name, last_name),
+            "phone_number": phone_number,
+        }, tokenize(first_name) + tokenize(last_name), phone_number
+
+
+def _teacher_entries(*where):
+    for teacher_id, first_name, last_name, phone_number in db.session.execute(
+        db.select(Teacher.teacher_id, Teacher.first_name, Teacher.last_name, Teacher.phone_number).where(*where)
+    ):
+        yield ('teacher', teacher_id), {
+            "type": "teacher",
+            "id": teacher_id,
+            "name": _full_name(first_name, last_name),
+            "phone_number": phone_number,
+        }, tokenize(first_name) + tokenize(last_name), phone_number
+
+
+def _user_entries(*where):
+    for user_id, username, email, first_name, last_name, role in db.session.execute(
+        db.select(User.user_id, User.username, User.email, User.first_name, User.last_name, User.role).where(*where)
+    ):
+        yield ('user', user_id), {
+            "type": "user",
+            "id": user_id,
+            "name": _full_name(first_name, last_name) or username,
+            "username": username,
+            "email": email,
+            "role": role,
+        }, tokenize(first_name) + tokenize(last_name) + tokenize(username) + tokenize(email), None
+
+
+ENTRIES = {
+    'student': _student_entries,
+    'parent': _parent_entries,
+    'teacher': _teacher_entries,
+    'user': _user_entries,
+}
+
+
+def _load_index():
+    index = PeopleIndex()
+    for entries in ENTRIES.values():
+        for key, document, tokens, phone in entries():
+            index.add(key, document, tokens, phone=phone)
+    index.freeze()
+    return index
+
+
+def _update_index(index, changes):
+    """A copy of ``index`` with the people keyed by ``changes`` reloaded, or dropped if deleted."""
+    index = index.copy()
+    ids_by_kind = {}
+    for kind, person_id in changes:
+        ids_by_kind.setdefault(kind, []).append(person_id)
+
+    for kind, ids in ids_by_kind.items():
+        model, id_column, _ = INDEXED[kind]
+        for chunk in chunks(ids):
+            for person_id in chunk:
+                index.remove((kind, person_id))
+            for key, document, tokens, phone in ENTRIES[kind](getattr(model, id_column).in_(chunk)):
+                index.add(key, document, tokens, phone=phone)
+    return index
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_for_indexed_changes(session, flush_context):
+    # The new, dirty and deleted collections and attribute history still
+    # describe this flush here, and new rows have their ids. Flushes that
+    # change no indexed column, like the password rehash on login, are skipped.
+    changes = set()
+    for kind, (model, id_column, columns) in INDEXED.items():
+        for obj in list(session.new) + list(session.deleted):
+            if isinstance(obj, model):
+                changes.add((kind, getattr(obj, id_column)))
+        for obj in session.dirty:
+            if isinstance(obj, model):
+                state = inspect(obj)
+                if any(state.attrs[column].history.has_changes() for column in columns):
+                    changes.add((kind, getattr(obj, id_column)))
+    if changes:
+        bump_version(session, CACHE_NAME, changes=changes)
+
+
+_index_cache = VersionedCache(
+    CACHE_NAME,
+    _load_index,
+    check_interval=lambda: current_app.config['SEARCH_INDEX_CHECK_INTERVAL'],
+    updater=_update_index,
+)
+
+
+def get_people_index():
+    """The people index, patched after this process changes indexed fields of users, students, parents or teachers.
+
+    Changes committed by other processes rebuild it.
+    """
+    return _index_cache.get()
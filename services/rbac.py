@@ -0,0 +1,139 @@
+from functools import wraps
+
+from flask import current_app
+from flask_jwt_extended import jwt_required, get_jwt
+
+from models import db, Role, Permission, RolePermission, UserRole
+from services.cache_versions import VersionedCache, watch_models
+
+CACHE_NAME = 'rbac'
+
+watch_models(CACHE_NAME, Role, Permission, RolePermission, UserRole)
+
+
+class AccessMap:
+    """Compiled role -> permissions and user -> roles mappings."""
+
+    def __init__(self, role_permissions, user_roles, permission_order):
+        self.role_permissions = role_permissions  # role name -> frozenset of permission names
+        self.user_roles = user_roles  # user_id -> tuple of role names
+        self.permission_order = permission_order  # permission name -> permission_id
+
+    def resolve(self, user_id):
+        roles = list(self.user_roles.get(user_id, ()))
+        permissions = set()
+        for role_name in roles:
+            permissions |= self.role_permissions.get(role_name, frozenset())
+        return roles, sorted(permissions, key=self.permission_order.get)
+
+
+def _load_access_map():
+    role_permissions = {}
+    permission_order = {}
+    rows = (
+        db.session.query(Role.name, Permission.name, Permission.permission_id)
+        .outerjoin(RolePermission, RolePermission.role_id == Role.role_id)
+        .outerjoin(Permission, Permission.permission_id == RolePermission.permission_id)
+        .all()
+    )
+    for role_name, permission_name, permission_id in rows:
+        role_permissions.setdefault(role_name, set())
+        if permission_name is not None:
+            role_permissions[role_name].add(permission_name)
+            permission_order[permission_name] = permission_id
+
+    user_roles = {}
+    rows = (
+        db.session.query(UserRole.user_id, Role.name)
+        .join(Role, Role.role_id == UserRole.role_id)
+        .order_by(UserRole.user_id, Role.role_id)
+        .all()
+    )
+    for user_id, role_name in rows:
+        user_roles.setdefault(user_id, []).append(role_name)
+
+    return AccessMap(
+        {name: frozenset(perms) for name, perms in role_permissions.items()},
+        {user_id: tuple(roles) for user_id, roles in user_roles.items()},
+        permission_order,
+    )
+
+
+_access_cache = VersionedCache(
+    CACHE_NAME,
+    _load_access_map,
+    check_interval=lambda: current_app.config['RBAC_CACHE_CHECK_INTERVAL'],
+)
+
+
+def get_access_map(fresh=False):
+    """The cached access map, with ``fresh`` checked against the committed version first."""
+    return _access_cache.get(fresh=fresh)
+
+
+def resolve_user_access(user_id):
+    """Role names and permission names of a user, served from the in-process cache.
+
+    The version is checked on every call, one primary key lookup, so users
+    created or re-roled on another worker aren't given stale access.
+    """
+    return get_access_map(fresh=True).resolve(user_id)
+
+
+def encode_permissions(permission_names, access_map=None):
+    """Pack permission names into a hex bitset, bit n being permission_id n."""
+    access_map = access_map or get_access_map()
+    mask = 0
+    for name in permission_names:
+        permission_id = access_map.permission_order.get(name)
+        if permission_id is not None:
+            mask |= 1 << permission_id
+    return format(mask, 'x')
+
+
+def access_claims(user_id, username):
+    """Additional JWT claims carrying a user's roles and permission bitset.
+
+    Tokens outlive the cache, so the version is checked before issuing one.
+    """
+    access_map = get_access_map(fresh=True)
+    roles, permissions = access_map.resolve(user_id)
+    return {
+        "username": username,
+        "roles": roles,
+        "perms": encode_permissions(permissions, access_map),
+    }
+
+
+def claims_have_permissions(claims, permission_names):
+    """Check decoded JWT claims for every one of ``permission_names``.
+
+    Only the permission_id of each name is looked up, in the cached access map.
+    """
+    try:
+        mask = int(claims.get("perms") or "0", 16)
+    except (TypeError, ValueError):
+        return False
+    permission_order = get_access_map().permission_order
+    for name in permission_names:
+        permission_id = permission_order.get(name)
+        if permission_id is None or not mask >> permission_id & 1:
+            return False
+    return True
+
+
+def require_permission(*permission_names):
+    """Allow the view only for access tokens granting all ``permission_names``.
+
+    Authorization comes from the already decoded token, so it costs no query.
+    Put it above ``marshal_with`` so the 403 body isn't marshalled.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if not claims_have_permissions(get_jwt(), permission_names):
+                return {"message": f"Missing permission: {', '.join(permission_names)}"}, 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
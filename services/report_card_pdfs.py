@@ -0,0 +1,352 @@
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.utils import secure_filename
+
+from models import db, Classes, Result
+from services.grading import academic_year_bounds
+from services.pdf import Drawing, PageTemplate
+from services.report_cards import TERMS, compute_report_cards
+
+EXAM_TYPES = ('Midterm', 'Final', 'Quiz', 'Assignment')
+
+# Table columns: (header, x position)
+COLUMNS = (
+    ('Subject', 44), ('Midterm', 180), ('Final', 225), ('Quiz', 265), ('Assign.', 300),
+    ('Average', 345), ('Grade', 395), ('Pos.', 435), ('Remarks', 475),
+)
+TABLE_TOP = 680
+ROW_HEIGHT = 18
+FOOTER_TOP = 180
+ROWS_PER_PAGE = (TABLE_TOP - ROW_HEIGHT - FOOTER_TOP) // ROW_HEIGHT
+
+
+class ReportCardRendererBusy(Exception):
+    """REPORT_CARD_CONCURRENT_BATCHES batches are rendering already."""
+
+
+def prepare_report_cards(term, academic_year, grade_level=None, class_id=None):
+    """Report cards of a grade level or class, with class names and the term's Result remarks."""
+    cards = compute_report_cards(term, academic_year, grade_level=grade_level, class_id=class_id)
+    if not cards:
+        return cards
+
+    class_names = dict(db.session.execute(
+        db.select(Classes.id, Classes.name).where(Classes.id.in_({card['class_id'] for card in cards}))
+    ).all())
+
+    start, end = academic_year_bounds(academic_year)
+    student_ids = [card['student_id'] for card in cards]
+    remarks = {}
+    for first in range(0, len(student_ids), 500):
+        rows = db.session.execute(
+            db.select(Result.student_id, Result.subject_id, Result.remarks)
+            .where(
+                Result.student_id.in_(student_ids[first:first + 500]),
+                Result.term == term,
+                Result.exam_date >= start,
+                Result.exam_date < end,
+            )
+            .order_by(Result.exam_date)
+        )
+        # The latest result of a subject wins
+        remarks.update(((row.student_id, row.subject_id), row.remarks) for row in rows if row.remarks)
+
+    for card in cards:
+        card['class_name'] = class_names.get(card['class_id'])
+        for subject in card['subjects']:
+            subject['remarks'] = remarks.get((card['student_id'], subject['subject_id']))
+    return cards
+
+
+def filename_for(card):
+    return secure_filename(
+        f"{card.get('class_name') or card['class_id']}_{card['student_id']}_{card['last_name']}_{card['first_name']}.pdf"
+    )
+
+
+def _build_template():
+    page = Drawing()
+    page.text(40, 795, "STUDENT REPORT CARD", size=16, bold=True)
+    page.line(40, 782, 555, 782, width=1)
+    for label, x, y in (
+        ("Name:", 40, 758), ("Student ID:", 320, 758),
+        ("Class:", 40, 740), ("Grade level:", 320, 740),
+        ("Term:", 40, 722), ("Academic year:", 320, 722),
+    ):
+        page.text(x, y, label, bold=True)
+
+    page.rect(40, TABLE_TOP, 515, ROW_HEIGHT, gray=0.88)
+    for header, x in COLUMNS:
+        page.text(x, TABLE_TOP + 6, header, size=9, bold=True)
+    page.line(40, FOOTER_TOP, 555, FOOTER_TOP, width=1)
+
+    page.text(40, FOOTER_TOP - 24, "Overall average:", bold=True)
+    page.text(40, FOOTER_TOP - 42, "Overall grade:", bold=True)
+    page.text(320, FOOTER_TOP - 24, "Class rank:", bold=True)
+    page.text(40, FOOTER_TOP - 80, "Class teacher's remarks:", bold=True)
+    page.line(40, FOOTER_TOP - 120, 300, FOOTER_TOP - 120)
+    page.text(40, FOOTER_TOP - 132, "Signature", size=8)
+    page.line(320, FOOTER_TOP - 120, 555, FOOTER_TOP - 120)
+    page.text(320, FOOTER_TOP - 132, "Date", size=8)
+    return PageTemplate(page)
+
+
+# Built once per process, every worker reuses it for all its documents
+_template = None
+
+
+def _get_template():
+    global _template
+    if _template is None:
+        _template = _build_template()
+    return _template
+
+
+def _format(value):
+    return '' if value is None else f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def render_report_card(card):
+    """PDF of one report card, continued on further pages if it has many subjects."""
+    subjects = card['subjects']
+    pages = []
+    for first in range(0, max(len(subjects), 1), ROWS_PER_PAGE):
+        page = Drawing()
+        page.text(110, 758, f"{card['first_name']} {card['last_name']}")
+        page.text(410, 758, card['student_id'])
+        page.text(110, 740, card.get('class_name') or card['class_id'])
+        page.text(410, 740, card['grade_level'])
+        page.text(110, 722, card['term'])
+        page.text(410, 722, card['academic_year'])
+
+        y = TABLE_TOP
+        for subject in subjects[first:first + ROWS_PER_PAGE]:
+            y -= ROW_HEIGHT
+            values = (
+                [(subject['name'] or '')[:24]]
+                + [_format(subject['exam_types'].get(exam_type)) for exam_type in EXAM_TYPES]
+                + [_format(subject['average']), subject['grade_letter'] or '',
+                   f"{subject['position']}/{subject['out_of']}", (subject.get('remarks') or '')[:16]]
+            )
+            for (_, x), value in zip(COLUMNS, values):
+                page.text(x, y + 6, value, size=9)
+            page.line(40, y, 555, y, width=0.25)
+
+        page.text(140, FOOTER_TOP - 24, _format(card['average']))
+        page.text(140, FOOTER_TOP - 42, card['grade_letter'] or '')
+        page.text(400, FOOTER_TOP - 24, f"{card['rank']} of {card['out_of']}")
+        pages.append(page)
+    return _get_template().render(pages)
+
+
+def _render_chunk(cards):
+    """Render ``cards`` in a worker process, returning (filename, pdf, seconds) for each."""
+    rendered = []
+    for card in cards:
+        started = perf_counter()
+        data = render_report_card(card)
+        rendered.append((filename_for(card), data, perf_counter() - started))
+    return rendered
+
+
+_executor = None
+_batches = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    """Process pool shared by every batch of this process, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def claim_render_batch():
+    """Reserve one of REPORT_CARD_CONCURRENT_BATCHES rendering batches, returning its release function.
+
+    Raises ReportCardRendererBusy at once when they are all taken, instead of
+    queueing yet another batch behind the ones in flight.
+    """
+    global _batches
+    with _executor_lock:
+        if _batches is None:
+            _batches = threading.BoundedSemaphore(current_app.config['REPORT_CARD_CONCURRENT_BATCHES'])
+    if not _batches.acquire(blocking=False):
+        raise ReportCardRendererBusy("Too many report card batches rendering")
+    return _batches.release
+
+
+def render_report_cards(cards, workers, chunk_size):
+    """Yield (filename, pdf, seconds) for every card, as the process pool finishes them.
+
+    Cards are sent to the workers ``chunk_size`` at a time to keep the
+    pickling overhead down. With no workers they are rendered in this process.
+    """
+    chunks = [cards[first:first + chunk_size] for first in range(0, len(cards), chunk_size)]
+    if not workers:
+        for chunk in chunks:
+            yield from _render_chunk(chunk)
+        return
+
+    executor = _get_executor(workers)
+    futures = [executor.submit(_render_chunk, chunk) for chunk in chunks]
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        # Drop whatever is still queued if the consumer went away early
+        for future in futures:
+            future.cancel()
+
+
+class RenderStats:
+    """Per-document render times and overall throughput of a batch."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.times = {}
+
+    def add(self, filename, seconds):
+        self.times[filename] = seconds
+
+    def summary(self, per_document=False):
+        elapsed = perf_counter() - self.started
+        times = sorted(self.times.values())
+        summary = {
+            "documents": len(times),
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(len(times) / elapsed, 1) if elapsed else None,
+            "render_ms": {
+                "mean": round(1000 * sum(times) / len(times), 2),
+                "p95": round(1000 * times[int(0.95 * (len(times) - 1))], 2),
+                "max": round(1000 * times[-1], 2),
+            } if times else None,
+        }
+        if per_document:
+            summary["documents_ms"] = {name: round(1000 * seconds, 2) for name, seconds in self.times.items()}
+        return summary
+
+
+class _ZipBuffer:
+    """Write-only file that hands over what was written so far, for streaming a ZipFile."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(cards, workers, chunk_size, logger=None):
+    """Yield a ZIP archive of the cards' PDFs piece by piece, as they are rendered.
+
+    The archive ends with render_report.json, the batch's render times and
+    throughput. The PDFs are compressed already, so entries are stored.
+    """
+    buffer = _ZipBuffer()
+    stats = RenderStats()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for filename, data, seconds in render_report_cards(cards, workers, chunk_size):
+            archive.writestr(filename, data)
+            stats.add(filename, seconds)
+            yield buffer.drain()
+        archive.writestr('render_report.json', json.dumps(stats.summary(per_document=True), indent=2))
+    yield buffer.drain()
+    if logger is not None:
+        logger.info("Rendered report cards: %s", json.dumps(stats.summary()))
+
+
+def _write_atomic(path, data):
+    partial = path + '.part'
+    with open(partial, 'wb') as out:
+        out.write(data)
+    os.replace(partial, path)
+
+
+def spool_report_cards(cards, folder, workers, chunk_size, on_progress=None):
+    """Write the cards' PDFs to ``folder``, resuming a previous run into the same folder.
+
+    Cards whose PDF is already there are skipped. progress.json records the
+    documents written so far with their render times, rewritten after every
+    chunk. Returns the progress written last.
+    """
+    os.makedirs(folder, exist_ok=True)
+    progress_path = os.path.join(folder, 'progress.json')
+    progress = {"total": len(cards), "documents_ms": {}}
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            progress["documents_ms"] = json.load(f).get("documents_ms", {})
+
+    pending = [card for card in cards if not os.path.exists(os.path.join(folder, filename_for(card)))]
+    progress["skipped"] = len(cards) - len(pending)
+    stats = RenderStats()
+
+    def save():
+        progress["done"] = progress["skipped"] + len(stats.times)
+        progress["last_run"] = stats.summary()
+        _write_atomic(progress_path, json.dumps(progress, indent=2).encode())
+        if on_progress:
+            on_progress(progress)
+
+    for filename, data, seconds in render_report_cards(pending, workers, chunk_size):
+        _write_atomic(os.path.join(folder, filename), data)
+        stats.add(filename, seconds)
+        progress["documents_ms"][filename] = round(1000 * seconds, 2)
+        if len(stats.times) % chunk_size == 0:
+            save()
+    save()
+    return progress
+
+
+@click.command('render-report-cards')
+@click.option('--term', required=True, type=click.Choice(TERMS))
+@click.option('--academic-year', required=True, help='e.g. 2024-2025')
+@click.option('--grade-level', default=None, type=click.Choice(['F1', 'F2', 'F3', 'F4']))
+@click.option('--class-id', default=None, type=int)
+@click.option('--out', 'folder', default=None,
+              help='Spool folder, run again with the same folder to resume (default under REPORT_CARD_SPOOL_FOLDER)')
+@with_appcontext
+def render_report_cards_command(term, academic_year, grade_level, class_id, folder):
+    """Render a term's PDF report cards for a grade level or class into a spool folder."""
+    if not grade_level and class_id is None:
+        raise click.UsageError("--grade-level or --class-id is required")
+    config = current_app.config
+    scope = grade_level or f"class_{class_id}"
+    folder = folder or os.path.join(
+        config['REPORT_CARD_SPOOL_FOLDER'], secure_filename(f"{scope}_{academic_year}_{term}")
+    )
+
+    cards = prepare_report_cards(term, academic_year, grade_level=grade_level, class_id=class_id)
+    progress = spool_report_cards(
+        cards, folder, config['REPORT_CARD_WORKERS'], config['REPORT_CARD_CHUNK_SIZE'],
+        on_progress=lambda p: click.echo(f"{p['done']}/{p['total']} report cards"),
+    )
+    run = progress["last_run"]
+    click.echo(
+        f"Rendered {run['documents']} report cards in {run['elapsed_seconds']}s "
+        f"({run['documents_per_second']}/s), skipped {progress['skipped']} already in {folder}"
+    )
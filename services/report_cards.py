@@ -0,0 +1,207 @@
+from io import BytesIO
+
+import pandas as pd
+from flask import current_app
+from openpyxl import Workbook
+
+from models import db, Grade, Student, Subject
+from services.grading import academic_year_bounds, get_scale_registry
+
+TERMS = ('Term 1', 'Term 2', 'Term 3')
+
+
+def _exam_type_averages(term, academic_year, grade_level=None, class_id=None):
+    """Mean percentage of every student, subject and exam type of a term, grouped in SQL.
+
+    Each row carries the student's class (``class_id``), the cohort they are
+    ranked in, and the class the subject was graded in (``subject_class_id``),
+    the one subject positions are taken within.
+    """
+    start, end = academic_year_bounds(academic_year)
+    percentage = db.func.coalesce(
+        Grade.percentage,
+        db.case((Grade.max_score != 0, Grade.score * 100.0 / Grade.max_score), else_=None),
+    )
+    query = (
+        db.select(
+            Grade.student_id,
+            Student.class_id,
+            Student.grade_level,
+            Grade.subject_id,
+            Grade.exam_type,
+            # A subject graded in two classes in one term is positioned in the latter
+            db.func.max(Grade.class_id),
+            db.func.avg(percentage),
+        )
+        .join(Student, Student.student_id == Grade.student_id)
+        .where(Grade.term == term, Grade.exam_date >= start, Grade.exam_date < end)
+        .group_by(Grade.student_id, Student.class_id, Student.grade_level, Grade.subject_id, Grade.exam_type)
+    )
+    if grade_level:
+        query = query.where(Student.grade_level == grade_level)
+    if class_id is not None:
+        # Classmates' grades plus everyone's in the subject classes they were
+        # graded in, which their subject positions are taken among
+        subject_classes = (
+            db.select(Grade.class_id)
+            .join(Student, Student.student_id == Grade.student_id)
+            .where(Student.class_id == class_id, Grade.term == term, Grade.exam_date >= start, Grade.exam_date < end)
+        )
+        query = query.where(db.or_(Student.class_id == class_id, Grade.class_id.in_(subject_classes)))
+    return pd.DataFrame(
+        db.session.execute(query).all(),
+        columns=['student_id', 'class_id', 'grade_level', 'subject_id', 'exam_type', 'subject_class_id', 'percentage'],
+    )
+
+
+def _ranks(frame, by, column='average'):
+    """Competition rank (1, 2, 2, 4) of ``column`` within each ``by`` group, and the group size."""
+    groups = frame.groupby(by)[column]
+    return groups.rank(method='min', ascending=False).astype(int), groups.transform('size').astype(int)
+
+
+def _letters(frame, academic_year):
+    """Grade letter of each ``average``, from the scale of the row's grade level."""
+    registry = get_scale_registry()
+    letters = pd.Series(None, index=frame.index, dtype=object)
+    for grade_level, rows in frame.groupby('grade_level'):
+        scale = registry.resolve(academic_year, grade_level)
+        letters[rows.index] = scale.letters_for(rows['average'].to_numpy())
+    return letters
+
+
+def compute_report_cards(term, academic_year, grade_level=None, class_id=None):
+    """Report cards of every graded student of a grade level or class for one term.
+
+    Exam types are averaged in SQL, then weighted into subject averages by
+    EXAM_TYPE_WEIGHTS with pandas. Every student gets one card, ranked within
+    their class. Subject positions are taken among the students graded in the
+    same class for that subject. Cards are ordered by class and rank.
+    """
+    scores = _exam_type_averages(term, academic_year, grade_level, class_id)
+    weights = current_app.config['EXAM_TYPE_WEIGHTS']
+    scores['weight'] = scores['exam_type'].map(weights).fillna(0.0)
+    scores = scores[scores['percentage'].notna() & (scores['weight'] > 0)].copy()
+    if scores.empty:
+        return []
+    scores['percentage'] = scores['percentage'].astype(float)
+    scores['weighted'] = scores['percentage'] * scores['weight']
+
+    subjects = scores.groupby(['student_id', 'class_id', 'grade_level', 'subject_id'], as_index=False).agg(
+        weighted=('weighted', 'sum'), weight=('weight', 'sum'), subject_class_id=('subject_class_id', 'max'),
+    )
+    subjects['average'] = (subjects['weighted'] / subjects['weight']).round(2)
+    subjects['position'], subjects['out_of'] = _ranks(subjects, ['subject_class_id', 'subject_id'])
+    subjects['grade_letter'] = _letters(subjects, academic_year)
+
+    overall = subjects.groupby(['student_id', 'class_id', 'grade_level'], as_index=False).agg(
+        average=('average', 'mean'),
+    )
+    overall['average'] = overall['average'].round(2)
+    if class_id is not None:
+        overall = overall[overall['class_id'] == class_id].copy()
+        if overall.empty:
+            return []
+    overall['rank'], overall['out_of'] = _ranks(overall, 'class_id')
+    overall['grade_letter'] = _letters(overall, academic_year)
+
+    # Plain dicts from here on, pandas row access is slow once per student
+    exam_types = {}
+    for student_id, subject_id, exam_type, percentage in zip(
+        scores['student_id'], scores['subject_id'], scores['exam_type'], scores['percentage'].round(2),
+    ):
+        exam_types.setdefault((student_id, subject_id), {})[exam_type] = float(percentage)
+
+    student_ids = overall['student_id'].tolist()
+    names = {}
+    for start in range(0, len(student_ids), 500):
+        chunk = student_ids[start:start + 500]
+        names.update(
+            (row.student_id, (row.first_name, row.last_name)) for row in db.session.execute(
+                db.select(Student.student_id, Student.first_name, Student.last_name)
+                .where(Student.student_id.in_(chunk))
+            )
+        )
+    subject_names = dict(db.session.execute(
+        db.select(Subject.subject_id, Subject.name)
+        .where(Subject.subject_id.in_(subjects['subject_id'].unique().tolist()))
+    ).all())
+
+    subjects_by_card = {}
+    for subject in subjects.sort_values(['student_id', 'subject_id']).to_dict('records'):
+        subjects_by_card.setdefault(subject['student_id'], []).append({
+            "subject_id": int(subject['subject_id']),
+            "name": subject_names.get(subject['subject_id']),
+            "class_id": int(subject['subject_class_id']),
+            "exam_types": exam_types[(subject['student_id'], subject['subject_id'])],
+            "average": float(subject['average']),
+            "grade_letter": subject['grade_letter'],
+            "position": int(subject['position']),
+            "out_of": int(subject['out_of']),
+        })
+
+    cards = []
+    for card in overall.sort_values(['class_id', 'rank', 'student_id']).itertuples(index=False):
+        first_name, last_name = names.get(card.student_id, (None, None))
+        cards.append({
+            "student_id": int(card.student_id),
+            "first_name": first_name,
+            "last_name": last_name,
+            "class_id": int(card.class_id),
+            "grade_level": card.grade_level,
+            "term": term,
+            "academic_year": academic_year,
+            "average": float(card.average),
+            "grade_letter": card.grade_letter,
+            "rank": int(card.rank),
+            "out_of": int(card.out_of),
+            "subjects": subjects_by_card[card.student_id],
+        })
+    return cards
+
+
+def student_report_card(student_id, term, academic_year):
+    """One student's report card, ranked within their class, or None."""
+    class_id = db.session.execute(
+        db.select(Student.class_id).where(Student.student_id == student_id)
+    ).scalar()
+    if class_id is None:
+        return None
+    for card in compute_report_cards(term, academic_year, class_id=class_id):
+        if card['student_id'] == student_id:
+            return card
+    return None
+
+
+def broadsheet_workbook(cards):
+    """An xlsx broadsheet of report cards, one sheet per class and one row per student."""
+    wb = Workbook(write_only=True)
+    by_class = {}
+    for card in cards:
+        by_class.setdefault(card['class_id'], []).append(card)
+
+    for class_id, class_cards in by_class.items():
+        subject_ids = sorted({s['subject_id'] for card in class_cards for s in card['subjects']})
+        subject_names = {s['subject_id']: s['name'] for card in class_cards for s in card['subjects']}
+        ws = wb.create_sheet(f"Class {class_id}")
+        ws.append(
+            ['Rank', 'Student ID', 'Name']
+            + [f"{subject_names[s]} ({s})" for s in subject_ids]
+            + ['Average', 'Grade']
+        )
+        for card in class_cards:
+            by_subject = {s['subject_id']: s for s in card['subjects']}
+            ws.append(
+                [f"{card['rank']}/{card['out_of']}", card['student_id'], f"{card['first_name']} {card['last_name']}"]
+                + [
+                    f"{by_subject[s]['average']} {by_subject[s]['grade_letter']} ({by_subject[s]['position']})"
+                    if s in by_subject else ''
+                    for s in subject_ids
+                ]
+                + [card['average'], card['grade_letter']]
+            )
+
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
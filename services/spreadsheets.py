@@ -0,0 +1,91 @@
+import csv
+import io
+import zipfile
+from contextlib import closing
+
+from openpyxl import load_workbook
+
+ALLOWED_IMPORT_EXTENSIONS = {'csv', 'xlsx'}
+
+# What csv and openpyxl raise on a damaged or mislabelled file
+_READ_ERRORS = (ValueError, KeyError, zipfile.BadZipFile, csv.Error)
+
+
+class UnreadableFile(ValueError):
+    """An import file of the wrong type, or one that can't be parsed."""
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def iter_csv_rows(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        for record in csv.DictReader(text):
+            yield {(key or '').strip(): _clean(value) for key, value in record.items()}
+    finally:
+        # Don't let the wrapper close the underlying upload
+        text.detach()
+
+
+def iter_xlsx_rows(stream):
+    # read_only streams the sheet XML instead of building the whole workbook
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        headers = [str(h).strip() if h is not None else '' for h in headers]
+        for values in rows:
+            if all(v is None for v in values):
+                continue
+            yield {key: _clean(value) for key, value in zip(headers, values) if key}
+    finally:
+        wb.close()
+
+
+def check_import_file(filename):
+    if file_extension(filename) not in ALLOWED_IMPORT_EXTENSIONS:
+        raise UnreadableFile(f"Unsupported file type, expected one of: {', '.join(sorted(ALLOWED_IMPORT_EXTENSIONS))}")
+
+
+def iter_rows(stream, filename):
+    """Yield one dict per data row of a CSV or XLSX file.
+
+    Rows are read lazily, so only the current row is held in memory. The file
+    is opened and its first row read up front, so UnreadableFile is raised here
+    for unsupported or broken files, and by the iterator for one that breaks
+    further on.
+    """
+    check_import_file(filename)
+    rows = iter_csv_rows(stream) if file_extension(filename) == 'csv' else iter_xlsx_rows(stream)
+    try:
+        first = next(rows, None)
+    except _READ_ERRORS as e:
+        raise UnreadableFile(str(e)) from e
+    return _rows_after(first, rows)
+
+
+def _rows_after(first, rows):
+    with closing(rows):
+        if first is None:
+            return
+        yield first
+        try:
+            yield from rows
+        except _READ_ERRORS as e:
+            raise UnreadableFile(str(e)) from e
+
+
+def iter_upload_rows(file):
+    """Yield one dict per data row of an uploaded CSV or XLSX file."""
+    return iter_rows(file.stream, file.filename)
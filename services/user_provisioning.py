@@ -0,0 +1,199 @@
+from datetime import datetime
+
+from models import db, User, Student, Parent, Role, UserRole, AuditLog, Classes
+from services.audit import audit_entry
+from services.batching import chunks
+from services.cache_versions import bump_version
+from services.fee_ledger import refresh_students
+from services.passwords import hash_passwords
+from services.people_search import CACHE_NAME as PEOPLE_SEARCH_CACHE
+from services.rbac import CACHE_NAME as RBAC_CACHE
+
+USER_ROLES = ('student', 'parent', 'teacher', 'admin')
+GRADE_LEVELS = ('F1', 'F2', 'F3', 'F4')
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class UserProvisioning:
+    """Create many accounts, with their student/parent profile and role, at once.
+
+    Every account is validated first, with username and email uniqueness
+    checked by one IN query per chunk. Only if all of them pass are passwords
+    hashed in parallel and the Users, students/parents, user_roles and
+    audit_logs rows written with multi-row inserts, all in one transaction.
+    """
+
+    def __init__(self, chunk_size=500):
+        self.chunk_size = max(1, int(chunk_size))
+        self.errors = []
+
+    def error(self, idx, username, message):
+        self.errors.append({
+            "index": idx,
+            "username": username,
+            "error": message
+        })
+
+    def _validate(self, idx, item):
+        username = item.get('username')
+        if not all([username, item.get('password'), item.get('email'), item.get('role')]):
+            self.error(idx, username, "username, password, email and role are required")
+            return None
+        if item['role'] not in USER_ROLES:
+            self.error(idx, username, f"role must be one of: {', '.join(USER_ROLES)}")
+            return None
+
+        user = {
+            "username": username,
+            "email": item['email'],
+            "role": item['role'],
+            "first_name": item.get('first_name'),
+            "last_name": item.get('last_name'),
+            "isActive": bool(item.get('isActive', False)),
+        }
+
+        profile = None
+        if item['role'] == 'student':
+            student = item.get('student') or {}
+            try:
+                profile = {
+                    "first_name": student.get('first_name') or user['first_name'],
+                    "last_name": student.get('last_name') or user['last_name'],
+                    "date_of_birth": _parse_date(student['date_of_birth']),
+                    "enrollment_year": _parse_date(student['enrollment_year']),
+                    "grade_level": student['grade_level'],
+                    "class_id": int(student['class_id']),
+                }
+            except KeyError as e:
+                self.error(idx, username, f"student.{e.args[0]} is required")
+                return None
+            except (TypeError, ValueError) as e:
+                self.error(idx, username, f"Invalid student details: {e}. Use YYYY-MM-DD dates.")
+                return None
+            if profile['grade_level'] not in GRADE_LEVELS:
+                self.error(idx, username, "student.grade_level must be F1, F2, F3, or F4")
+                return None
+        elif item['role'] == 'parent':
+            parent = item.get('parent') or {}
+            profile = {
+                "first_name": parent.get('first_name') or user['first_name'],
+                "last_name": parent.get('last_name') or user['last_name'],
+                "phone_number": parent.get('phone_number'),
+            }
+
+        if profile is not None and not (profile['first_name'] and profile['last_name']):
+            self.error(idx, username, "first_name and last_name are required for students and parents")
+            return None
+        return user, profile, item['password']
+
+    def _check_unique(self, accounts):
+        """Report usernames and emails repeated in the batch or already taken."""
+        seen_usernames, seen_emails = set(), set()
+        for idx, (user, _, _) in accounts:
+            if user['username'] in seen_usernames:
+                self.error(idx, user['username'], "Username is repeated in this batch")
+            elif user['email'] in seen_emails:
+                self.error(idx, user['username'], "Email is repeated in this batch")
+            seen_usernames.add(user['username'])
+            seen_emails.add(user['email'])
+
+        for chunk in chunks(accounts, self.chunk_size):
+            usernames = [user['username'] for _, (user, _, _) in chunk]
+            emails = [user['email'] for _, (user, _, _) in chunk]
+            taken = db.session.execute(
+                db.select(User.username, User.email)
+                .where(db.or_(User.username.in_(usernames), User.email.in_(emails)))
+            ).all()
+            taken_usernames = {username for username, _ in taken}
+            taken_emails = {email for _, email in taken}
+            for idx, (user, _, _) in chunk:
+                if user['username'] in taken_usernames:
+                    self.error(idx, user['username'], "Username already exists")
+                elif user['email'] in taken_emails:
+                    self.error(idx, user['username'], "Email already exists")
+
+    def _check_classes(self, accounts):
+        """Report students placed in a class that doesn't exist."""
+        class_ids = {profile['class_id'] for _, (user, profile, _) in accounts if user['role'] == 'student'}
+        if not class_ids:
+            return
+        existing = set(db.session.execute(
+            db.select(Classes.id).where(Classes.id.in_(class_ids))
+        ).scalars())
+        for idx, (user, profile, _) in accounts:
+            if user['role'] == 'student' and profile['class_id'] not in existing:
+                self.error(idx, user['username'], f"Class {profile['class_id']} not found")
+
+    def provision(self, items):
+        """Create the accounts in ``items``, or none of them if any is invalid.
+
+        Returns a (response, status) pair.
+        """
+        accounts = []
+        for idx, item in enumerate(items):
+            if not isinstance(item, dict):
+                self.error(idx, None, "Expected an object")
+                continue
+            account = self._validate(idx, item)
+            if account is not None:
+                accounts.append((idx, account))
+        if accounts:
+            self._check_unique(accounts)
+            self._check_classes(accounts)
+        if self.errors or not accounts:
+            self.errors.sort(key=lambda e: e['index'])
+            return {"message": "No users were created", "errors": self.errors}, 400
+
+        hashes = hash_passwords([password for _, (_, _, password) in accounts])
+        role_ids = dict(db.session.execute(db.select(Role.name, Role.role_id)).all())
+
+        created = []
+        student_ids = []
+        try:
+            for chunk in chunks(list(zip(accounts, hashes)), self.chunk_size):
+                users = [dict(user, password_hash=password_hash) for (_, (user, _, _)), password_hash in chunk]
+                db.session.execute(User.__table__.insert(), users)
+                user_ids = dict(db.session.execute(
+                    db.select(User.username, User.user_id)
+                    .where(User.username.in_([user['username'] for user in users]))
+                ).all())
+
+                students, parents, user_roles, logs = [], [], [], []
+                for (idx, (user, profile, _)), _ in chunk:
+                    user_id = user_ids[user['username']]
+                    created.append({"index": idx, "user_id": user_id, "username": user['username']})
+                    if user['role'] == 'student':
+                        students.append(dict(profile, user_id=user_id))
+                    elif user['role'] == 'parent':
+                        parents.append(dict(profile, user_id=user_id))
+                    role_id = role_ids.get(user['role'].capitalize())
+                    if role_id is not None:
+                        user_roles.append({"user_id": user_id, "role_id": role_id})
+                    logs.append(audit_entry("CREATE", f"Created user {user['username']}", user_id=user_id))
+
+                if students:
+                    db.session.execute(Student.__table__.insert(), students)
+                    student_ids += db.session.execute(
+                        db.select(Student.student_id)
+                        .where(Student.user_id.in_([s['user_id'] for s in students]))
+                    ).scalars().all()
+                if parents:
+                    db.session.execute(Parent.__table__.insert(), parents)
+                if user_roles:
+                    db.session.execute(UserRole.__table__.insert(), user_roles)
+                # Written in the transaction, like audit(..., sync=True)
+                db.session.execute(AuditLog.__table__.insert(), logs)
+
+            # Core inserts skip the ORM flush hooks keeping these up to date
+            refresh_students(db.session.connection(), student_ids)
+            bump_version(db.session, RBAC_CACHE)
+            bump_version(db.session, PEOPLE_SEARCH_CACHE)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return {"message": f"{len(created)} users created successfully", "users": created}, 201
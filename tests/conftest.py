@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+import pytest
+
+# Set before any test module imports config, every module shares this database
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f"sqlite:///{_db_file.name}"
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    os.unlink(_db_file.name)
@@ -0,0 +1,36 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from models import db, AuditLog, Role, User, UserRole
+from services.rbac import access_claims
+
+
+@pytest.fixture(scope='module')
+def headers(app):
+    with app.app_context():
+        user = User(username='auditor', email='auditor@example.com', role='admin', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(UserRole(user_id=user.user_id, role_id=Role.query.filter_by(name='Admin').one().role_id))
+        # One statement, so every row gets the same second-precision server default created_at
+        db.session.execute(AuditLog.__table__.insert(), [
+            {"action": "PAGING_TEST", "description": f"Row {i}"} for i in range(5)
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(user.user_id), additional_claims=access_claims(user.user_id, user.username))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_pages_through_rows_sharing_a_timestamp(app, headers):
+    client = app.test_client()
+    pages = []
+    query = {"action": "PAGING_TEST", "limit": 2}
+    while len(pages) < 5:
+        response = client.get('/api/audit_logs', headers=headers, query_string=query)
+        assert response.status_code == 200
+        pages.append([row["description"] for row in response.json])
+        if 'X-Next-Cursor' not in response.headers:
+            break
+        query["after"] = response.headers['X-Next-Cursor']
+
+    assert pages == [["Row 4", "Row 3"], ["Row 2", "Row 1"], ["Row 0"]]
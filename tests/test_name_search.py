@@ -0,0 +1,62 @@
+import importlib.util
+import os
+from datetime import date
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from models import db, User, Student, Classes
+from services.name_search import filter_student_names
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), '..', 'migrations', 'versions', '9a41c6e0d5b3_add_student_name_search_index.py'
+)
+
+
+def _run_migration(connection):
+    """Create the student_name_fts table and triggers the way the migration does."""
+    spec = importlib.util.spec_from_file_location('name_search_migration', MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with Operations.context(MigrationContext.configure(connection)):
+        migration.upgrade()
+
+
+@pytest.fixture(scope='module')
+def app(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            _run_migration(connection)
+        school_class = Classes(name='F1A')
+        db.session.add(school_class)
+        db.session.flush()
+        for i, (first_name, last_name) in enumerate([('John', 'Smith'), ('Jane', 'Smith'), ('Bob', 'Jones')]):
+            user = User(username=f'student{i}', email=f'student{i}@example.com', role='student', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Student(
+                user_id=user.user_id, first_name=first_name, last_name=last_name,
+                date_of_birth=date(2010, 1, 1), enrollment_year=date(2024, 1, 1),
+                grade_level='F1', class_id=school_class.id,
+            ))
+        db.session.commit()
+    return app
+
+
+def _names(**filters):
+    query = filter_student_names(Student.query, **filters)
+    return sorted(f"{s.first_name} {s.last_name}" for s in query)
+
+
+def test_name_matches_first_or_last_name(app):
+    with app.app_context():
+        assert _names(name='john') == ['John Smith']
+        assert _names(name='smith') == ['Jane Smith', 'John Smith']
+
+
+def test_combined_filters_keep_their_own_terms(app):
+    with app.app_context():
+        assert _names(first_name='bob', last_name='smith') == []
+        assert _names(first_name='jan', last_name='smi') == ['Jane Smith']
+        assert _names(first_name='john', name='smith') == ['John Smith']